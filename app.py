@@ -1,15 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import pickle
 import numpy as np
 import os
-import requests
-import json
-from huggingface_hub import InferenceClient
-from groq import Groq
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from app.features import transform_from_artifact
+from app.llm import BACKEND_ENV, get_gateway
+from app.model import load_artifact
+from app.profiling import stage
+from app.rollups import build_rollups, load_rollups, network_hourly_profile, network_row
+
 # Configuration and environment loading
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(BASE_DIR, ".env"))
@@ -17,45 +18,142 @@ load_dotenv(os.path.join(BASE_DIR, ".env"))
 st.set_page_config(page_title="EV Charging Planner", layout="wide")
 
 # Configuration for data and models (Root level)
+# The memory-mapped flat artifact is preferred when both formats have been exported
+FLAT_MODEL_PATH = os.path.join(BASE_DIR, "models", "rf_demand")
 MODEL_PATH = os.path.join(BASE_DIR, "models", "rf_demand.pkl")
 STATION_INFO_PATH = os.path.join(BASE_DIR, "data", "raw", "UrbanEVDataset", "UrbanEVDataset", "20220901-20230228_zone-cleaned-aggregated", "station_information.csv")
+ROLLUP_DIR = os.path.join(BASE_DIR, "models", "rollups")
+
+def read_model_artifact():
+    """
+    (model, feature_transform, failed_path) from the artifact; (None, None, None) if nothing is
+    trained yet. Runs on the warmup thread, so failures are returned rather than drawn with st.
+    """
+    for path in (FLAT_MODEL_PATH, MODEL_PATH):
+        if os.path.exists(path):
+            artifact = load_artifact(path)
+            if artifact is None:
+                return None, None, path
+            return artifact["model"], transform_from_artifact(artifact), None
+    return None, None, None
+
+def read_station_info():
+    if os.path.exists(STATION_INFO_PATH):
+        return pd.read_csv(STATION_INFO_PATH)
+    return None
 
 @st.cache_resource
+def start_background_warmup():
+    """
+    Starts loading the model and station table on background threads the first time any session
+    runs the script. The page chrome renders meanwhile; each page only blocks on what it shows.
+    Unpickling an sklearn forest imports sklearn, so that cost lands here rather than on first paint.
+    """
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="warmup")
+    return {"model": pool.submit(read_model_artifact), "stations": pool.submit(read_station_info)}
+
 def load_rf_model():
-    if os.path.exists(MODEL_PATH):
-        try:
-            with open(MODEL_PATH, "rb") as f:
-                return pickle.load(f)
-        except Exception as e:
-            st.error(f"Model loading failed: {e}")
-            raise e
-    return None
+    """Returns (model, feature_transform), waiting for the warmup if it is still running."""
+    model, transform, failed_path = start_background_warmup()["model"].result()
+    if failed_path is not None:
+        st.error(f"Model loading failed for {failed_path}. Check the server logs for details.")
+    return model, transform
 
 @st.cache_data
 def load_station_info():
-    if os.path.exists(STATION_INFO_PATH):
-        return pd.read_csv(STATION_INFO_PATH)
-    return None
+    return start_background_warmup()["stations"].result()
 
-model = load_rf_model()
-stations = load_station_info()
+@st.cache_data
+def load_rollup_tables(built_at):
+    """
+    Materialized network/zone aggregates, re-read only when a data refresh rewrites them
+    (built_at is the manifest mtime). Without materialized rollups, pile aggregates are
+    computed once from station_information rather than on every rerun.
+    """
+    tables = load_rollups(ROLLUP_DIR)
+    if tables is None:
+        station_info = load_station_info()
+        tables = build_rollups(station_info) if station_info is not None else None
+    return tables
+
+def rollup_built_at():
+    manifest = os.path.join(ROLLUP_DIR, "manifest.json")
+    return os.path.getmtime(manifest) if os.path.exists(manifest) else None
+
+def network_summary(tables):
+    """One-paragraph network description shared by the planner prompt and the chat context."""
+    network = network_row(tables)
+    top_ids = tables['top_stations']['station_id'].head(3).tolist()
+    summary = (f"Total Stations: {network['total_stations']}. Total Charging Piles: {network['total_piles']}. "
+               f"Average Piles per Station: {network['mean_piles']:.1f} (median {network['median_piles']:.0f}, "
+               f"std {network['std_piles']:.1f}). Traffic zones (TAZID): {network['zones']}. "
+               f"High-capacity stations (Top 3 IDs): {top_ids}.")
+    if 'hist_mean_volume' in network:
+        summary += (f" Historical mean hourly volume per station: {network['hist_mean_volume']:.2f} kWh"
+                    f" across {network['hist_stations']} stations with telemetry.")
+    if pd.notna(network.get('hist_mean_occupancy')):
+        summary += f" Historical mean occupancy: {network['hist_mean_occupancy']:.0%}."
+    if 'zone_hourly' in tables:
+        busiest = network_hourly_profile(tables['zone_hourly']).nlargest(3, 'mean_volume')
+        hours = ", ".join(f"{hour:02d}:00 ({volume:.1f} kWh)" for hour, volume in zip(busiest['hour'], busiest['mean_volume']))
+        summary += f" Historically busiest hours of day: {hours}."
+    if 'peak_predicted_volume' in network:
+        summary += (f" Predicted network peak load next week: {network['peak_predicted_volume']:.0f} kWh/h"
+                    f" at {pd.Timestamp(network['peak_time']):%a %H:%M}.")
+    return summary
+
+def busiest_zones(tables, n=5):
+    zones = tables['zones']
+    by = 'peak_predicted_volume' if 'peak_predicted_volume' in zones else 'total_piles'
+    return zones.sort_values(by=by, ascending=False).head(n)
+
+def render_stream(placeholder, chunks):
+    """Paints streamed LLM text into placeholder as it arrives and returns the full reply."""
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text + "▌")
+    placeholder.markdown(text)
+    return text
+
+# LLM_BACKEND=stub answers both AI pages offline, without any API key
+use_stub_llm = os.getenv(BACKEND_ENV, "").lower() == "stub"
+
+start_background_warmup()
 
 st.title("Intelligent EV Charging Demand Prediction")
 st.sidebar.header("Navigation")
 page = st.sidebar.radio("Go to", ["Dashboard", "Demand Forecasting", "AI Infrastructure Planner", "Ask AI", "About"])
 
+# Rollups are small materialized tables; the model and the full station table load per page
+rollups = load_rollup_tables(rollup_built_at()) if page != "About" else None
+
 if page == "Dashboard":
     st.subheader("Station Network Overview")
+    stations = load_station_info()
     if stations is not None:
         col1, col2 = st.columns([2, 1])
         with col1:
             st.map(stations, latitude="latitude", longitude="longitude")
         with col2:
-            st.metric("Total Stations", len(stations))
-            avg_piles = stations['charge_count'].mean()
-            st.metric("Avg Piles / Station", f"{avg_piles:.1f}")
+            network = network_row(rollups)
+            st.metric("Total Stations", network['total_stations'])
+            st.metric("Avg Piles / Station", f"{network['mean_piles']:.1f}",
+                      help=f"Median {network['median_piles']:.0f}, std {network['std_piles']:.1f}")
+            if 'hist_stations' in network:
+                st.metric("Stations with Telemetry", network['hist_stations'])
+            if 'peak_predicted_volume' in network:
+                st.metric("Predicted Peak Load (next week)", f"{network['peak_predicted_volume']:.0f} kWh/h")
             st.write("Top Stations by Capacity:")
-            st.dataframe(stations.sort_values(by='charge_count', ascending=False).head(10))
+            st.dataframe(rollups['top_stations'])
+        st.write("Zone Overview (TAZID):")
+        st.dataframe(rollups['zones'], use_container_width=True)
+        if 'zone_hourly' in rollups:
+            st.write("Historical Demand by Hour of Day:")
+            zone_hourly = rollups['zone_hourly']
+            zone = st.selectbox("Traffic zone (TAZID)", ["All zones"] + sorted(zone_hourly['TAZID'].unique().tolist()))
+            profile = network_hourly_profile(zone_hourly) if zone == "All zones" else zone_hourly[zone_hourly['TAZID'] == zone]
+            st.bar_chart(profile, x='hour', y='mean_volume')
 
 elif page == "Demand Forecasting":
     st.subheader("Forecast Charging Demand")
@@ -71,27 +169,25 @@ elif page == "Demand Forecasting":
 
     # Process inputs for model prediction
     day_idx = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"].index(day_of_week)
-    is_weekend = 1 if day_idx >= 5 else 0
-    
-    input_df = pd.DataFrame([[hour, day_idx, is_weekend, s_price, e_price]], 
-                           columns=['hour', 'day_of_week', 'is_weekend', 's_price', 'e_price'])
     
+    model, feature_transform = load_rf_model()
     if model:
-        prediction = model.predict(input_df)[0]
+        # The artifact's FeatureTransform derives is_weekend and the cyclical hour encoding
+        # in the exact column order the model was trained on; no per-request DataFrame.
+        input_X = feature_transform.transform({'hour': hour, 'day_of_week': day_idx, 's_price': s_price, 'e_price': e_price})
+        with stage("app.predict", rows=len(input_X)):
+            prediction = model.predict(input_X)[0]
         st.success(f"Predicted Charging Volume: **{prediction:.2f} kWh**")
         
         # Display hourly trends
         st.write("---")
         st.write("Hourly Demand Trend (24h)")
-        hours = list(range(24))
-        trend_X = pd.DataFrame({
-            'hour': hours,
-            'day_of_week': [day_idx]*24,
-            'is_weekend': [is_weekend]*24,
-            's_price': [s_price]*24,
-            'e_price': [e_price]*24
-        })
-        trend_preds = model.predict(trend_X)
+        hours = np.arange(24)
+        trend_X = feature_transform.transform({'hour': hours, 'day_of_week': day_idx, 's_price': s_price, 'e_price': e_price})
+        with stage("app.predict_trend", rows=len(trend_X)):
+            trend_preds = model.predict(trend_X)
+        # plotly is only needed for this chart, so other pages never import it
+        import plotly.express as px
         fig = px.line(x=hours, y=trend_preds, labels={'x': 'Hour of Day', 'y': 'Predicted Demand (kWh)'}, 
                      title=f"Predicted Demand Cycle for {day_of_week}")
         st.plotly_chart(fig, use_container_width=True)
@@ -105,23 +201,21 @@ elif page == "AI Infrastructure Planner":
     token = os.getenv("HUGGINGFACE_API_KEY") or st.secrets.get("HUGGINGFACE_API_KEY", "")
 
     if st.button("Generate Planning Report"):
-        if not token:
+        if not token and not use_stub_llm:
             st.error("Missing HuggingFace API Key. Please set HUGGINGFACE_API_KEY in your environment or Streamlit Secrets.")
         else:
             with st.spinner("Analyzing demand patterns and communicating with LLM..."):
                 try:
                     # Construct Data Summary
+                    # Read from the precomputed rollups; nothing is rescanned per click
                     summary = ""
-                    if stations is not None:
-                        total_stations = len(stations)
-                        total_piles = stations['charge_count'].sum()
-                        avg_piles = stations['charge_count'].mean()
-                        top_stations = stations.sort_values(by='charge_count', ascending=False).head(3)['station_id'].tolist()
-                        
-                        summary = f"Total Stations: {total_stations}. Total Charging Piles: {total_piles}. Average Piles per Station: {avg_piles:.1f}. High-capacity stations (Top 3 IDs): {top_stations}."
+                    if rollups is not None:
+                        zone_table = busiest_zones(rollups).to_string(index=False, float_format="%.1f")
+                        summary = f"{network_summary(rollups)}\nBusiest zones:\n{zone_table}"
                     
-                    # We create a generic prompt for the LLM
-                    client = InferenceClient("HuggingFaceH4/zephyr-7b-beta", token=token)
+                    # We create a generic prompt for the LLM; the gateway reuses one pooled client
+                    gateway = get_gateway()
+                    backend = gateway.backend("huggingface", token)
                     
                     messages = [
                         {"role": "system", "content": "You are an expert AI urban infrastructure planner. Based on the following data analysis of an EV charging network, please provide a structured recommendation report. Please provide your output exactly with these 4 sections: 1. Demand Summary, 2. High-load Locations, 3. Suggestions for New Charging Stations, 4. Load Balancing Recommendations"},
@@ -129,15 +223,16 @@ elif page == "AI Infrastructure Planner":
                     ]
                     
                     try:
-                        response = client.chat_completion(
+                        # Tokens render as they stream in; an identical summary within the TTL is served from cache
+                        generated_text = render_stream(st.empty(), gateway.stream_chat(
+                            backend,
                             messages,
+                            context=summary,
                             max_tokens=512,
                             temperature=0.3
-                        )
-                        generated_text = response.choices[0].message.content
+                        ))
                         if generated_text:
                             st.success("Report Generated Successfully!")
-                            st.markdown(generated_text)
                         else:
                             st.error("HuggingFace API returned an empty response.")
                     except Exception as e:
@@ -174,22 +269,31 @@ elif page == "Ask AI":
 
     # Data Context Preparation
     def get_context():
-        if stations is None:
+        if rollups is None:
             return "No dataset loaded."
         
-        stats = stations['charge_count'].describe()
-        top_10 = stations.sort_values(by='charge_count', ascending=False).head(10)
+        network = network_row(rollups)
+        top_10 = rollups['top_stations']
+        hourly_profile = "No telemetry history materialized."
+        if 'zone_hourly' in rollups:
+            profile = network_hourly_profile(rollups['zone_hourly'])[['hour', 'mean_volume', 'mean_occupancy']]
+            hourly_profile = profile.to_string(index=False, float_format="%.2f")
         
         context = f"""
         EV CHARGING DATASET CONTEXT:
-        - Total Stations: {len(stations)}
-        - Total Charging Piles: {stations['charge_count'].sum()}
-        - Avg Piles per Station: {stats['mean']:.2f}
-        - Max Piles at a single station: {stats['max']}
+        - Total Stations: {network['total_stations']}
+        - Total Charging Piles: {network['total_piles']}
+        - Avg Piles per Station: {network['mean_piles']:.2f}
+        - Max Piles at a single station: {network['max_piles']}
+        - Summary: {network_summary(rollups)}
         - Top 10 Stations by Capacity: 
         {top_10[['station_id', 'charge_count']].to_string(index=False)}
+        - Busiest Traffic Zones (TAZID):
+        {busiest_zones(rollups).to_string(index=False, float_format="%.1f")}
+        - Historical Demand by Hour of Day (network):
+        {hourly_profile}
         
-        The dataset includes station_id, longitude, latitude, and charge_count.
+        The dataset includes station_id, longitude, latitude, charge_count and TAZID zone.
         """
         return context
 
@@ -200,7 +304,7 @@ elif page == "Ask AI":
 
     # Chat Input
     if prompt := st.chat_input("Ask something about the charging stations..."):
-        if not api_key:
+        if not api_key and not use_stub_llm:
             st.error("Missing Groq API Key. Please set GROQ_API_KEY in your environment or Streamlit Secrets.")
         else:
             # Add user message to history
@@ -213,7 +317,8 @@ elif page == "Ask AI":
                 full_response = ""
                 
                 try:
-                    client = Groq(api_key=api_key)
+                    gateway = get_gateway()
+                    backend = gateway.backend("groq", api_key)
                     
                     data_context = get_context()
                     
@@ -230,16 +335,13 @@ elif page == "Ask AI":
                         {"role": m["role"], "content": m["content"]} for m in st.session_state.messages
                     ]
                     
-                    completion = client.chat.completions.create(
-                        model="llama-3-70b-8192",
-                        messages=api_messages,
-                        temperature=0.3,
+                    full_response = render_stream(message_placeholder, gateway.stream_chat(
+                        backend,
+                        api_messages,
+                        context=data_context,
                         max_tokens=1024,
-                        stream=False
-                    )
-                    
-                    full_response = completion.choices[0].message.content
-                    message_placeholder.markdown(full_response)
+                        temperature=0.3
+                    ))
                     
                     # Add assistant response to history
                     st.session_state.messages.append({"role": "assistant", "content": full_response})
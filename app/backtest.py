@@ -0,0 +1,105 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.model import build_forest, evaluate_model
+
+logger = logging.getLogger(__name__)
+
+def rolling_origin_folds(times: np.ndarray, n_folds: int = 5, min_train_fraction: float = 0.5) -> List[Tuple[int, int]]:
+    """
+    Expanding-window folds over a time-sorted array, as (train_end, test_end) row offsets.
+    The first min_train_fraction of the time span is always training data; the remainder is cut
+    into n_folds equal-duration test windows, each trained on everything strictly before it.
+    """
+    if n_folds < 1:
+        raise ValueError("Backtesting needs at least one fold.")
+    start, end = times[0], times[-1]
+    origin = start + (end - start) * min_train_fraction
+    cutoffs = [origin + (end - origin) * i / n_folds for i in range(n_folds + 1)]
+    # The last window must include the final timestamp itself
+    bounds = [int(np.searchsorted(times, c, side="left")) for c in cutoffs[:-1]] + [len(times)]
+    folds = [(bounds[i], bounds[i + 1]) for i in range(n_folds)]
+    return [(train_end, test_end) for train_end, test_end in folds if train_end > 0 and test_end > train_end]
+
+def _fit_fold(cache_dir: str, fold: int, train_end: int, test_end: int) -> Dict[str, Any]:
+    """Worker: slices the shared cached matrix (zero-copy memory maps) and fits one fold."""
+    start = time.perf_counter()
+    X = np.load(os.path.join(cache_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(cache_dir, "y.npy"), mmap_mode="r")
+    times = np.load(os.path.join(cache_dir, "time.npy"), mmap_mode="r")
+
+    # Folds already run in parallel, so each forest stays single-threaded to avoid oversubscription
+    model = build_forest(n_jobs=1)
+    fit_start = time.perf_counter()
+    model.fit(X[:train_end], y[:train_end])
+    fit_s = time.perf_counter() - fit_start
+
+    metrics = evaluate_model(model, X[train_end:test_end], y[train_end:test_end])
+    return {
+        "fold": fold,
+        "train_rows": train_end,
+        "test_rows": test_end - train_end,
+        "test_start": pd.Timestamp(times[train_end]).isoformat(),
+        "test_end": pd.Timestamp(times[test_end - 1]).isoformat(),
+        "MAE": float(metrics["MAE"]),
+        "RMSE": float(metrics["RMSE"]),
+        "fit_seconds": fit_s,
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+def run_backtest(X: np.ndarray, y: np.ndarray, times: np.ndarray, n_folds: int = 5,
+                 min_train_fraction: float = 0.5, max_workers: Optional[int] = None,
+                 cache_dir: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Rolling-origin backtest of the standard forest. Unlike the random train_test_split in
+    train_demand_model, every fold is scored strictly on hours after its training data.
+
+    The feature matrix is sorted by time and cached once as .npy files; each fold worker
+    memory-maps them and trains on a contiguous prefix, so no fold repeats feature work or
+    receives a pickled copy of the data. Returns the per-fold table and an aggregate summary
+    suitable for save_model's metrics.
+    """
+    order = np.argsort(np.asarray(times, dtype="datetime64[ns]"), kind="stable")
+    sorted_times = np.asarray(times, dtype="datetime64[ns]")[order]
+    folds = rolling_origin_folds(sorted_times, n_folds, min_train_fraction)
+    if not folds:
+        raise ValueError("Time span too short to form any backtest fold.")
+
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    fold_cache = tempfile.mkdtemp(prefix="backtest-", dir=cache_dir)
+    try:
+        np.save(os.path.join(fold_cache, "X.npy"), np.ascontiguousarray(X[order], dtype=np.float32))
+        np.save(os.path.join(fold_cache, "y.npy"), np.asarray(y)[order])
+        np.save(os.path.join(fold_cache, "time.npy"), sorted_times)
+
+        logger.info(f"Running {len(folds)} rolling-origin folds over {len(order)} rows (workers={max_workers or os.cpu_count()})")
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_fit_fold, fold_cache, i, train_end, test_end)
+                       for i, (train_end, test_end) in enumerate(folds)]
+            rows = [future.result() for future in futures]
+        total_s = time.perf_counter() - start
+    finally:
+        shutil.rmtree(fold_cache, ignore_errors=True)
+
+    table = pd.DataFrame(rows)
+    # Weight by test rows so short trailing windows don't dominate the headline number
+    weights = table["test_rows"] / table["test_rows"].sum()
+    summary = {
+        "folds": rows,
+        "n_folds": len(rows),
+        "mean_MAE": float((table["MAE"] * weights).sum()),
+        "mean_RMSE": float(np.sqrt((table["RMSE"] ** 2 * weights).sum())),
+        "worst_MAE": float(table["MAE"].max()),
+        "total_wall_seconds": total_s,
+    }
+    return table, summary
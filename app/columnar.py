@@ -0,0 +1,70 @@
+import os
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+# Column order travels with the arrays, since npz members come back in no guaranteed order
+COLUMNS_KEY = "__columns__"
+
+PathOrFile = Union[str, os.PathLike, BinaryIO]
+
+def frame_arrays(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """One NumPy array per column, plus the column order under COLUMNS_KEY."""
+    arrays = {col: frame[col].to_numpy() for col in frame.columns}
+    arrays[COLUMNS_KEY] = np.array(list(frame.columns), dtype=str)
+    return arrays
+
+def save_frame_npz(frame: pd.DataFrame, target: PathOrFile, compress: bool = False) -> None:
+    """
+    Writes a frame column-by-column to an .npz. Uncompressed members load as a straight buffer
+    read; compress trades that for size on files that are written once and read rarely.
+    """
+    (np.savez_compressed if compress else np.savez)(target, **frame_arrays(frame))
+
+def load_frame_npz(source: PathOrFile) -> pd.DataFrame:
+    """Inverse of save_frame_npz. Never unpickles; object columns are not supported."""
+    with np.load(source, allow_pickle=False) as npz:
+        columns = [str(c) for c in npz[COLUMNS_KEY]]
+        return pd.DataFrame({col: npz[col] for col in columns}, columns=columns)
+
+@contextmanager
+def staged_directory(target: Union[str, os.PathLike]) -> Iterator[Path]:
+    """
+    Yields an empty staging directory beside target. When the block completes, the staging
+    directory replaces target, so a crashed writer never leaves a half-written directory behind
+    and readers see either the complete old directory or the complete new one.
+    If the block raises, the staging directory is removed and target is left untouched.
+    """
+    target_dir = Path(target)
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging_dir = target_dir.with_name(f".{target_dir.name}.tmp-{os.getpid()}")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir()
+    try:
+        yield staging_dir
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    # Rename the old directory aside rather than deleting it first: the target is then missing only
+    # between two renames, not for the whole recursive delete, and is restored if the swap fails
+    retired_dir = target_dir.with_name(f".{target_dir.name}.old-{os.getpid()}")
+    if retired_dir.exists():
+        shutil.rmtree(retired_dir)
+    if target_dir.exists():
+        os.replace(target_dir, retired_dir)
+    try:
+        os.replace(staging_dir, target_dir)
+    except OSError:
+        if retired_dir.exists():
+            os.replace(retired_dir, target_dir)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    shutil.rmtree(retired_dir, ignore_errors=True)
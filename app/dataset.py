@@ -0,0 +1,110 @@
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Column files backing a MemmapTrainingSet, with their on-disk dtypes
+_COLUMNS = {"X": np.float32, "y": np.float32, "time": np.int64, "station_id": np.int64}
+# Dropped into every directory a MemmapTrainingSet creates; only directories carrying it are ever cleared
+_OWNER_MARKER = ".memmap_training_set"
+
+class MemmapTrainingSet:
+    """
+    Append-only, disk-backed feature/target matrix for out-of-core training.
+    Station frames are transformed and written straight into preallocated float32 memory maps
+    that grow geometrically, so the full training set never has to be resident (or concatenated)
+    in RAM. The resulting arrays can be handed to sklearn's fit without a copy.
+    """
+
+    def __init__(self, directory: str, n_features: int, initial_rows: int = 1 << 20):
+        if not self.is_reusable(directory):
+            raise FileExistsError(f"{directory} is not empty and was not created by MemmapTrainingSet; refusing to clear it.")
+        self.directory = Path(directory)
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        self.directory.mkdir(parents=True)
+        (self.directory / _OWNER_MARKER).touch()
+        self.n_features = n_features
+        self.rows = 0
+        self.capacity = 0
+        self._maps: Dict[str, np.memmap] = {}
+        self._resize(initial_rows)
+
+    @staticmethod
+    def is_reusable(directory: str) -> bool:
+        """True if directory is absent, empty, or a scratch directory left by an earlier MemmapTrainingSet."""
+        path = Path(directory)
+        if not path.exists():
+            return True
+        return path.is_dir() and (not any(path.iterdir()) or (path / _OWNER_MARKER).exists())
+
+    def _shape(self, name: str, rows: int) -> tuple:
+        return (rows, self.n_features) if name == "X" else (rows,)
+
+    def _resize(self, capacity: int) -> None:
+        for name, dtype in _COLUMNS.items():
+            path = self.directory / f"{name}.bin"
+            if name in self._maps:
+                self._maps[name].flush()
+                del self._maps[name]
+            # Growing the sparse file is O(1); untouched pages cost neither RAM nor disk
+            with open(path, "ab") as f:
+                f.truncate(int(np.prod(self._shape(name, capacity))) * np.dtype(dtype).itemsize)
+            self._maps[name] = np.memmap(path, dtype=dtype, mode="r+", shape=self._shape(name, capacity))
+        self.capacity = capacity
+
+    def append(self, X: np.ndarray, y: np.ndarray, times: np.ndarray, station_ids: np.ndarray) -> None:
+        n = len(y)
+        if self.rows + n > self.capacity:
+            self._resize(max(self.capacity * 2, self.rows + n))
+        end = self.rows + n
+        self._maps["X"][self.rows:end] = X
+        self._maps["y"][self.rows:end] = y
+        self._maps["time"][self.rows:end] = np.asarray(times, dtype="datetime64[ns]").view(np.int64)
+        self._maps["station_id"][self.rows:end] = station_ids
+        self.rows = end
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Row-trimmed views over the maps (no copies). time is returned as datetime64[ns]."""
+        for m in self._maps.values():
+            m.flush()
+        views = {name: m[:self.rows] for name, m in self._maps.items()}
+        views["time"] = views["time"].view("datetime64[ns]")
+        return views
+
+    def nbytes(self) -> int:
+        return sum(int(np.prod(self._shape(name, self.rows))) * np.dtype(dtype).itemsize
+                   for name, dtype in _COLUMNS.items())
+
+    def close(self, remove: bool = False) -> None:
+        for m in self._maps.values():
+            m.flush()
+        self._maps.clear()
+        if remove:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+def holdout_mask(station_ids: np.ndarray, times: np.ndarray, test_fraction: float = 0.2) -> np.ndarray:
+    """
+    Deterministic ~test_fraction holdout keyed on (station, hour) rather than row position,
+    so the split is reproducible even though pool workers append stations in arbitrary order.
+    """
+    hours = np.asarray(times, dtype="datetime64[h]").astype(np.int64).astype(np.uint64)
+    key = hours * np.uint64(0x9E3779B97F4A7C15) ^ np.asarray(station_ids, dtype=np.uint64) * np.uint64(0xBF58476D1CE4E5B9)
+    key ^= key >> np.uint64(31)
+    key *= np.uint64(0x94D049BB133111EB)
+    key ^= key >> np.uint64(29)
+    return (key % np.uint64(10_000)) < np.uint64(int(test_fraction * 10_000))
+
+def stratified_sample(frame: pd.DataFrame, max_rows: int, seed: Optional[int] = 42) -> pd.DataFrame:
+    """
+    Down-samples one station's hourly frame to roughly max_rows, proportionally within each
+    hour-of-week cell, so every daily/weekly demand regime stays represented in the sample.
+    """
+    if len(frame) <= max_rows:
+        return frame
+    frac = max_rows / len(frame)
+    return frame.groupby(['day_of_week', 'hour'], group_keys=False).sample(frac=frac, random_state=seed)
@@ -0,0 +1,89 @@
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+# Raw request/telemetry fields the transform consumes. is_weekend is always derived from
+# day_of_week so a caller can never send a contradictory flag.
+RAW_FIELDS = ('hour', 'day_of_week', 's_price', 'e_price')
+
+# Canonical training column order. Changing it requires retraining; artifacts carry their own copy.
+DEFAULT_FEATURES = ['hour_sin', 'hour_cos', 'day_of_week', 'is_weekend', 's_price', 'e_price']
+FEATURE_SPEC_VERSION = 1
+
+# Each model feature is a pure function of the raw fields, evaluated column-wise over a whole batch.
+# Cyclical hour encoding mirrors app.preprocess.engineer_features exactly.
+_FEATURE_BUILDERS: Dict[str, Callable[[Dict[str, np.ndarray]], np.ndarray]] = {
+    'hour_sin': lambda raw: np.sin(2 * np.pi * raw['hour'] / 24),
+    'hour_cos': lambda raw: np.cos(2 * np.pi * raw['hour'] / 24),
+    'hour': lambda raw: raw['hour'],
+    'day_of_week': lambda raw: raw['day_of_week'],
+    'is_weekend': lambda raw: raw['day_of_week'] >= 5,
+    's_price': lambda raw: raw['s_price'],
+    'e_price': lambda raw: raw['e_price'],
+}
+
+class FeatureTransform:
+    """
+    Single source of truth for turning raw fields into the model's feature matrix.
+    train_model.py fits on its output, save_model stores its spec inside the artifact, and
+    every serving path rebuilds it from that spec, so training and serving column order
+    cannot drift apart.
+    """
+
+    def __init__(self, features: Optional[List[str]] = None):
+        self.features = list(features or DEFAULT_FEATURES)
+        unknown = [f for f in self.features if f not in _FEATURE_BUILDERS]
+        if unknown:
+            raise ValueError(f"No transform registered for features: {unknown}")
+
+    def to_spec(self) -> Dict[str, Any]:
+        return {"version": FEATURE_SPEC_VERSION, "raw_fields": list(RAW_FIELDS), "features": list(self.features)}
+
+    @classmethod
+    def from_spec(cls, spec: Optional[Mapping[str, Any]]) -> "FeatureTransform":
+        """Rebuilds the transform stored in an artifact. Legacy artifacts without a spec get the defaults."""
+        if not spec:
+            return cls()
+        if spec.get("version", 0) > FEATURE_SPEC_VERSION:
+            raise ValueError(f"Feature spec v{spec.get('version')} is newer than this build supports.")
+        return cls(spec["features"])
+
+    def transform(self, raw: Mapping[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Builds the float32 feature matrix from column-like raw fields (a DataFrame, a dict of
+        arrays, or scalars that broadcast against them) in one vectorized pass.
+        Pass a preallocated `out` of shape (n, n_features) to avoid allocating per call.
+        """
+        missing = [f for f in RAW_FIELDS if f not in raw]
+        if missing:
+            raise ValueError(f"Raw input missing required fields: {missing}")
+
+        columns = np.broadcast_arrays(*(np.asarray(raw[f], dtype=np.float64) for f in RAW_FIELDS))
+        fields = {name: np.atleast_1d(col) for name, col in zip(RAW_FIELDS, columns)}
+        non_finite = [name for name, col in fields.items() if not np.isfinite(col).all()]
+        if non_finite:
+            raise ValueError(f"Raw fields must be finite numbers: {non_finite}")
+        # Written as "not within range" so any value that fails the comparison is rejected too
+        hour, day_of_week = fields['hour'], fields['day_of_week']
+        if not ((hour >= 0) & (hour <= 23)).all() or not ((day_of_week >= 0) & (day_of_week <= 6)).all():
+            raise ValueError("hour must be within 0-23 and day_of_week within 0-6")
+
+        n_rows = len(hour)
+        if out is None:
+            out = np.empty((n_rows, len(self.features)), dtype=np.float32)
+        elif out.shape != (n_rows, len(self.features)) or out.dtype != np.float32:
+            raise ValueError(f"Preallocated buffer must be float32 of shape {(n_rows, len(self.features))}")
+
+        for j, name in enumerate(self.features):
+            out[:, j] = _FEATURE_BUILDERS[name](fields)
+        return out
+
+    def transform_records(self, records: Iterable[Mapping[str, Any]]) -> np.ndarray:
+        """Column-izes a list of JSON-style dicts (one per row) and transforms them in one step."""
+        records = list(records)
+        missing = [f for f in RAW_FIELDS if any(f not in rec for rec in records)]
+        if missing:
+            raise ValueError(f"Instances missing required fields: {missing}")
+        return self.transform({f: [rec[f] for rec in records] for f in RAW_FIELDS})
+
+def transform_from_artifact(artifact: Mapping[str, Any]) -> FeatureTransform:
+    return FeatureTransform.from_spec(artifact.get("features"))
@@ -0,0 +1,300 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.columnar import load_frame_npz, save_frame_npz
+from app.features import FeatureTransform, transform_from_artifact
+from app.model import FlatForest, load_artifact, load_training_set
+from app.preprocess import DEFAULT_STATION_INFO_PATH
+from app.shards import ShardRegistry
+from app.profiling import add_profiling_args, session_from_args, timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HORIZON_HOURS = 168
+DEFAULT_CHUNK_ROWS = 65_536
+# Probed in order when --model is not given, as app.py's loader does: the memory-mapped flat
+# export when one exists, else the pickle train_model.py writes by default
+DEFAULT_MODEL_PATHS = ("models/rf_demand", "models/rf_demand.pkl")
+DEFAULT_OUTPUT_PATH = "models/forecast_week.npz"
+DEFAULT_S_PRICE = 0.5
+DEFAULT_E_PRICE = 1.0
+
+# Compact on-disk dtypes for the grid. Predictions stay float32; the rest fit much narrower types.
+GRID_DTYPES = {
+    'station_id': np.int32, 'TAZID': np.int32, 'charge_count': np.int16,
+    'hour': np.int8, 'day_of_week': np.int8, 's_price': np.float32, 'e_price': np.float32,
+}
+
+def latest_station_prices(training_set: Dict[str, np.ndarray], transform: FeatureTransform) -> pd.DataFrame:
+    """Each station's most recently observed service fee and electricity price from a stored training set."""
+    columns = {name: transform.features.index(name) for name in ('s_price', 'e_price') if name in transform.features}
+    if len(columns) < 2:
+        raise ValueError("Training set features do not include s_price and e_price.")
+    last = (pd.DataFrame({'station_id': training_set['station_id'], 'time': training_set['time'],
+                          **{name: training_set['X'][:, j] for name, j in columns.items()}})
+            .sort_values('time', kind='stable')
+            .drop_duplicates('station_id', keep='last'))
+    return last[['station_id', 's_price', 'e_price']]
+
+@timed("forecast.build_grid")
+def build_forecast_grid(stations: pd.DataFrame, start: pd.Timestamp, horizon_hours: int = DEFAULT_HORIZON_HOURS,
+                        prices: Optional[pd.DataFrame] = None, s_price: float = DEFAULT_S_PRICE,
+                        e_price: float = DEFAULT_E_PRICE) -> pd.DataFrame:
+    """
+    The full (station, hour) grid for horizon_hours starting at start, station-major, in one
+    vectorized step: calendar columns are tiled, station attributes repeated, never looped.
+    Prices come from `prices` (station_id, s_price, e_price) where known, else the scalar defaults.
+    """
+    start = pd.Timestamp(start).floor('h')
+    hours = pd.date_range(start, periods=horizon_hours, freq='h')
+    n_stations = len(stations)
+
+    stations = stations[['station_id', 'charge_count', 'TAZID']].reset_index(drop=True)
+    station_prices = pd.DataFrame({'s_price': np.full(n_stations, s_price), 'e_price': np.full(n_stations, e_price)})
+    if prices is not None:
+        known = stations[['station_id']].merge(prices, on='station_id', how='left')
+        station_prices = known[['s_price', 'e_price']].fillna({'s_price': s_price, 'e_price': e_price})
+
+    grid = {
+        'station_id': np.repeat(stations['station_id'].to_numpy(), horizon_hours),
+        'time': np.tile(hours.to_numpy(), n_stations),
+        'hour': np.tile(hours.hour.to_numpy(), n_stations),
+        'day_of_week': np.tile(hours.dayofweek.to_numpy(), n_stations),
+        's_price': np.repeat(station_prices['s_price'].to_numpy(), horizon_hours),
+        'e_price': np.repeat(station_prices['e_price'].to_numpy(), horizon_hours),
+        'charge_count': np.repeat(stations['charge_count'].to_numpy(), horizon_hours),
+        'TAZID': np.repeat(stations['TAZID'].to_numpy(), horizon_hours),
+    }
+    return pd.DataFrame({name: col.astype(GRID_DTYPES[name]) if name in GRID_DTYPES else col
+                         for name, col in grid.items()})
+
+# Per-worker predictor, loaded once by the pool initializer rather than pickled per chunk
+_worker_predictor: Optional[Any] = None
+
+class _SingleThreadedForest:
+    """A FlatForest that scores on the calling thread only."""
+
+    def __init__(self, forest: FlatForest):
+        self.forest = forest
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.forest.predict(X, n_threads=1)
+
+def _load_predictor(model_path: Optional[str], shard_dir: Optional[str], pooled: bool = False) -> Any:
+    """
+    In a pool worker (pooled=True), the model is pinned to one thread, as backtest and shard workers
+    pin n_jobs=1; the pool already spreads chunks over every core. sklearn forests stay sklearn there,
+    since at 65k-row chunks their predict outpaces FlatForest (see benchmarks/bench_flat_forest.py).
+    """
+    model = None
+    if model_path is not None:
+        artifact = load_artifact(model_path)
+        if artifact is None:
+            raise RuntimeError(f"No usable model artifact at {model_path}")
+        model = artifact["model"]
+        if hasattr(model, "estimators_"):
+            model = model.set_params(n_jobs=1) if pooled else FlatForest.from_sklearn(model)
+        elif pooled and isinstance(model, FlatForest):
+            model = _SingleThreadedForest(model)
+    if shard_dir is not None:
+        return ShardRegistry(shard_dir, fallback_model=model)
+    return model
+
+def _init_worker(model_path: Optional[str], shard_dir: Optional[str], pooled: bool = False) -> None:
+    global _worker_predictor
+    _worker_predictor = _load_predictor(model_path, shard_dir, pooled)
+
+@timed("forecast.predict_chunk", rows=lambda result, *args: len(result[1]))
+def _predict_chunk(cache_dir: str, start: int, stop: int) -> Tuple[int, np.ndarray]:
+    """Worker: scores rows [start, stop) of the memory-mapped feature matrix."""
+    X = np.load(os.path.join(cache_dir, "X.npy"), mmap_mode="r")[start:stop]
+    if isinstance(_worker_predictor, ShardRegistry):
+        zones = np.load(os.path.join(cache_dir, "zones.npy"), mmap_mode="r")[start:stop]
+        return start, _worker_predictor.predict(zones, X).astype(np.float32)
+    return start, np.asarray(_worker_predictor.predict(X), dtype=np.float32)
+
+@timed("forecast.predict_grid")
+def predict_grid(grid: pd.DataFrame, transform: FeatureTransform, model_path: Optional[str],
+                 shard_dir: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 max_workers: Optional[int] = None) -> np.ndarray:
+    """
+    Scores every grid row in chunk_rows slices across a process pool.
+    The feature matrix is built once and shared with workers as a memory-mapped .npy file, and
+    each worker opens the model (memory-mapped, for flat artifacts) once. With shard_dir,
+    rows are routed to their TAZID's shard and model_path only covers zones without one.
+    """
+    X = transform.transform(grid)
+    bounds = [(start, min(start + chunk_rows, len(X))) for start in range(0, len(X), chunk_rows)]
+    workers = min(max_workers or os.cpu_count() or 1, len(bounds))
+
+    chunk_cache = tempfile.mkdtemp(prefix="forecast-")
+    try:
+        np.save(os.path.join(chunk_cache, "X.npy"), X)
+        np.save(os.path.join(chunk_cache, "zones.npy"), grid['TAZID'].to_numpy())
+        predictions = np.empty(len(X), dtype=np.float32)
+
+        if workers <= 1:
+            # Not worth a pool; score in-process with the same chunking
+            _init_worker(model_path, shard_dir)
+            results = (_predict_chunk(chunk_cache, start, stop) for start, stop in bounds)
+            for start, chunk in results:
+                predictions[start:start + len(chunk)] = chunk
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, shard_dir, True)) as pool:
+                futures = [pool.submit(_predict_chunk, chunk_cache, start, stop) for start, stop in bounds]
+                for future in futures:
+                    start, chunk = future.result()
+                    predictions[start:start + len(chunk)] = chunk
+    finally:
+        for name in ("X.npy", "zones.npy"):
+            Path(chunk_cache, name).unlink(missing_ok=True)
+        os.rmdir(chunk_cache)
+    return predictions
+
+def write_forecast(frame: pd.DataFrame, path: str) -> None:
+    """
+    Writes the forecast column-by-column: Parquet when the path asks for it (needs pyarrow),
+    otherwise a compressed .npz with one narrow-typed array per column.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.suffix == ".parquet":
+        frame.to_parquet(target, index=False)
+        return
+    # Through a file object, so numpy never appends .npz to a differently named path
+    with open(target, "wb") as f:
+        save_frame_npz(frame, f, compress=True)
+
+def load_forecast(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return load_frame_npz(path)
+
+def resolve_model_path(requested: Optional[str]) -> Optional[str]:
+    """The --model path if it exists, else (with no --model) the first default artifact on disk."""
+    if requested is not None:
+        return requested if os.path.exists(requested) else None
+    return next((path for path in DEFAULT_MODEL_PATHS if os.path.exists(path)), None)
+
+def servable_stations(stations: pd.DataFrame, shard_dir: str) -> pd.DataFrame:
+    """
+    Without a global fallback model, only stations whose TAZID zone has a shard can be scored.
+    Zones below the shard row threshold, or with no training data at all, are dropped.
+    """
+    registry = ShardRegistry(shard_dir)
+    servable = stations['TAZID'].map(registry.can_serve)
+    if not servable.all():
+        logger.warning(f"No global model to fall back on: dropping {int((~servable).sum())} of {len(stations)} "
+                       f"stations whose TAZID zone has no shard")
+    return stations[servable]
+
+def resolve_transform(model_path: Optional[str], shard_dir: Optional[str]) -> FeatureTransform:
+    """The feature spec the forecast must honour: the global artifact's, else the shard registry's."""
+    if model_path is not None:
+        artifact = load_artifact(model_path)
+        if artifact is None:
+            raise RuntimeError(f"No usable model artifact at {model_path}. Run train_model.py first.")
+        return transform_from_artifact(artifact)
+    if shard_dir is not None:
+        return ShardRegistry(shard_dir).transform
+    raise ValueError("Forecasting needs a model artifact, a shard registry, or both.")
+
+def forecast_network(stations: pd.DataFrame, start: pd.Timestamp, model_path: Optional[str],
+                     shard_dir: Optional[str] = None, horizon_hours: int = DEFAULT_HORIZON_HOURS,
+                     prices: Optional[pd.DataFrame] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     max_workers: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """
+    Week-ahead (by default) demand for every station. Returns the grid with a predicted_volume
+    column and timing stats: grid build and prediction seconds, and predictions per second.
+    """
+    transform = resolve_transform(model_path, shard_dir)
+    t0 = time.perf_counter()
+    grid = build_forecast_grid(stations, start, horizon_hours, prices)
+    t1 = time.perf_counter()
+    grid['predicted_volume'] = predict_grid(grid, transform, model_path, shard_dir, chunk_rows, max_workers)
+    t2 = time.perf_counter()
+
+    stats = {
+        "rows": len(grid),
+        "stations": len(stations),
+        "horizon_hours": horizon_hours,
+        "grid_seconds": t1 - t0,
+        "predict_seconds": t2 - t1,
+        "total_seconds": t2 - t0,
+        "predictions_per_second": len(grid) / max(t2 - t1, 1e-9),
+    }
+    return grid, stats
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Forecast hourly demand for every station over the coming week.")
+    parser.add_argument("--model", default=None,
+                        help=f"Global model artifact, flat dir or pickle (default: the first of {', '.join(DEFAULT_MODEL_PATHS)} that exists).")
+    parser.add_argument("--shards", default=None, help="Shard registry; each station's TAZID model is used where one exists.")
+    parser.add_argument("--station-info", default=DEFAULT_STATION_INFO_PATH)
+    parser.add_argument("--start", default=None, help="First forecast hour (default: the next full hour).")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON_HOURS, help="Hours to forecast.")
+    parser.add_argument("--training-set", default="models/training_set.npz",
+                        help="Stored training set supplying each station's latest prices (defaults apply if absent).")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH, help="Output file (.npz, or .parquet if pyarrow is installed).")
+    parser.add_argument("--rollup-dir", default=None,
+                        help="Materialized rollups to refresh with the new predicted peak loads (default: models/rollups).")
+    parser.add_argument("--no-rollups", action="store_true", help="Leave the rollup tables untouched.")
+    add_profiling_args(parser)
+    args = parser.parse_args(argv)
+    with session_from_args(args):
+        run(args)
+
+def run(args: argparse.Namespace) -> None:
+    model_path = resolve_model_path(args.model)
+    requested = args.model or " or ".join(DEFAULT_MODEL_PATHS)
+    if model_path is None and args.shards is None:
+        logger.critical(f"No model artifact at {requested}. Run train_model.py first.")
+        sys.exit(1)
+    try:
+        transform = resolve_transform(model_path, args.shards)
+    except RuntimeError as e:
+        logger.critical(str(e))
+        sys.exit(1)
+
+    start = pd.Timestamp(args.start) if args.start else pd.Timestamp.now().ceil('h')
+    stations = pd.read_csv(args.station_info)
+    if model_path is None:
+        logger.warning(f"No global model at {requested}; forecasting from the shard registry alone")
+        stations = servable_stations(stations, args.shards)
+
+    prices = None
+    training_set = load_training_set(args.training_set)
+    if training_set is not None:
+        prices = latest_station_prices(training_set, transform)
+        logger.info(f"Using latest observed prices for {len(prices)} stations; defaults for the rest")
+
+    grid, stats = forecast_network(stations, start, model_path, args.shards, args.horizon, prices,
+                                   args.chunk_rows, args.workers)
+    write_forecast(grid, args.output)
+
+    logger.info(f"Forecast {stats['rows']:,} station-hours ({stats['stations']} stations x {stats['horizon_hours']} h) "
+                f"from {start} in {stats['total_seconds']:.2f}s")
+    logger.info(f"Grid build {stats['grid_seconds'] * 1e3:.1f} ms, prediction {stats['predict_seconds']:.2f}s "
+                f"({stats['predictions_per_second']:,.0f} predictions/s)")
+    logger.info(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024 ** 2:.2f} MiB)")
+
+    if not args.no_rollups:
+        # Imported here because app.rollups reads forecasts through this module
+        from app.rollups import DEFAULT_ROLLUP_DIR, refresh_forecast_rollups
+        refresh_forecast_rollups(grid, args.rollup_dir or DEFAULT_ROLLUP_DIR, args.output)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    main(sys.argv[1:])
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HF_PLANNER_MODEL = "HuggingFaceH4/zephyr-7b-beta"
+GROQ_CHAT_MODEL = "llama-3-70b-8192"
+DEFAULT_TTL_S = 15 * 60
+DEFAULT_MAX_ENTRIES = 256
+# LLM_BACKEND=stub routes every page to the offline stub, e.g. for demos or latency testing
+BACKEND_ENV = "LLM_BACKEND"
+
+Messages = List[Dict[str, str]]
+
+def _delta_text(chunk: Any) -> str:
+    """Token text from an OpenAI-style streaming chunk (both HF and Groq use this shape)."""
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    return getattr(choices[0].delta, "content", None) or ""
+
+class HuggingFaceBackend:
+    """HF Inference Providers chat completion. One InferenceClient is reused across calls."""
+
+    name = "huggingface"
+
+    def __init__(self, token: str, model: str = HF_PLANNER_MODEL):
+        # Imported on first use so pages that never call the planner don't pay for huggingface_hub
+        from huggingface_hub import InferenceClient
+        self.model = model
+        self._client = InferenceClient(model, token=token)
+
+    def stream(self, messages: Messages, max_tokens: int, temperature: float) -> Iterator[str]:
+        for chunk in self._client.chat_completion(messages, max_tokens=max_tokens, temperature=temperature, stream=True):
+            yield _delta_text(chunk)
+
+class GroqBackend:
+    """Groq Cloud chat completion over a single pooled client (and its keep-alive HTTP connections)."""
+
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str = GROQ_CHAT_MODEL):
+        from groq import Groq
+        self.model = model
+        self._client = Groq(api_key=api_key)
+
+    def stream(self, messages: Messages, max_tokens: int, temperature: float) -> Iterator[str]:
+        completion = self._client.chat.completions.create(model=self.model, messages=messages, temperature=temperature,
+                                                          max_tokens=max_tokens, stream=True)
+        for chunk in completion:
+            yield _delta_text(chunk)
+
+class StubBackend:
+    """
+    Offline stand-in with provider-like timing: first_token_s before the first token, then
+    tokens_per_s. The reply echoes a digest of the prompt, so equal prompts get equal replies.
+    """
+
+    name = "stub"
+
+    def __init__(self, model: str = "stub", first_token_s: float = 0.4, tokens_per_s: float = 60.0, reply_tokens: int = 60):
+        self.model = model
+        self.first_token_s = first_token_s
+        self.tokens_per_s = tokens_per_s
+        self.reply_tokens = reply_tokens
+        self.calls = 0
+
+    def stream(self, messages: Messages, max_tokens: int, temperature: float) -> Iterator[str]:
+        self.calls += 1
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:8]
+        question = messages[-1]["content"][:80] if messages else ""
+        words = f"[stub {digest}] Offline answer to: {question}.".split()
+        words += ["lorem"] * max(0, min(self.reply_tokens, max_tokens) - len(words))
+        time.sleep(self.first_token_s)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(1 / self.tokens_per_s)
+            yield word if i == 0 else " " + word
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of complete responses. Expired entries count as misses."""
+
+    def __init__(self, ttl_s: float = DEFAULT_TTL_S, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+def cache_key(backend: str, model: str, messages: Messages, context: Optional[str] = None,
+              max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> str:
+    """SHA-256 over everything that determines the reply: provider, model, prompt, data snapshot, sampling."""
+    payload = {"backend": backend, "model": model, "messages": messages, "context": context,
+               "max_tokens": max_tokens, "temperature": temperature}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls from the app. Pools one backend client per
+    (provider, credential, model), streams tokens as they arrive and serves repeated
+    (model, prompt, data context) requests from the response cache without a network call.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        self.cache = cache or ResponseCache()
+        self._backends: Dict[Tuple[str, str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def backend(self, provider: str, credential: str = "", model: Optional[str] = None) -> Any:
+        """The pooled client for provider ('huggingface', 'groq' or 'stub'); LLM_BACKEND=stub overrides."""
+        if os.getenv(BACKEND_ENV, "").lower() == "stub":
+            provider = "stub"
+        # Credentials only participate through a digest, so keys never sit in the pool's dict
+        pool_key = (provider, hashlib.sha256(credential.encode()).hexdigest(), model or "")
+        with self._lock:
+            if pool_key not in self._backends:
+                if provider == "huggingface":
+                    self._backends[pool_key] = HuggingFaceBackend(credential, model or HF_PLANNER_MODEL)
+                elif provider == "groq":
+                    self._backends[pool_key] = GroqBackend(credential, model or GROQ_CHAT_MODEL)
+                elif provider == "stub":
+                    self._backends[pool_key] = StubBackend(model or "stub")
+                else:
+                    raise ValueError(f"Unknown LLM provider {provider!r}")
+            return self._backends[pool_key]
+
+    def stream_chat(self, backend: Any, messages: Messages, context: Optional[str] = None,
+                    max_tokens: int = 512, temperature: float = 0.3) -> Iterator[str]:
+        """
+        Yields reply text incrementally. A cache hit yields the stored reply as one chunk; a miss
+        streams from the backend and caches the full reply only once it completed without error.
+        `context` is the data snapshot behind the prompt, so a data refresh never serves a stale answer.
+        """
+        key = cache_key(backend.name, backend.model, messages, context, max_tokens, temperature)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for {backend.name}/{backend.model}")
+            yield cached
+            return
+
+        start = time.perf_counter()
+        parts: List[str] = []
+        for text in backend.stream(messages, max_tokens, temperature):
+            if not text:
+                continue
+            if not parts:
+                logger.info(f"{backend.name}/{backend.model} first token after {time.perf_counter() - start:.2f}s")
+            parts.append(text)
+            yield text
+        reply = "".join(parts)
+        logger.info(f"{backend.name}/{backend.model} reply of {len(reply)} chars in {time.perf_counter() - start:.2f}s")
+        if reply:
+            self.cache.put(key, reply)
+
+    def chat(self, backend: Any, messages: Messages, context: Optional[str] = None,
+             max_tokens: int = 512, temperature: float = 0.3) -> str:
+        """Blocking convenience wrapper around stream_chat."""
+        return "".join(self.stream_chat(backend, messages, context, max_tokens, temperature))
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway, so pooled clients and cached replies survive Streamlit reruns and sessions."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
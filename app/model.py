@@ -1,52 +1,272 @@
 import os
+import json
 import pickle
+import hashlib
 import logging
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Tuple, Dict, Any, Optional
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Tuple, Dict, Any, Optional, Union
+
+# sklearn costs about a second to import. Inference on flat artifacts, ingestion and the
+# dashboard never need it, so it is imported inside the functions that fit or score with it.
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+
+from app.columnar import staged_directory
+from app.profiling import timed
 
 logger = logging.getLogger(__name__)
 
-def train_demand_model(X: pd.DataFrame, y: pd.Series) -> Tuple[RandomForestRegressor, Dict[str, float]]:
+def build_forest(n_estimators: int = 100, n_jobs: int = -1) -> "RandomForestRegressor":
+    from sklearn.ensemble import RandomForestRegressor
+    # We restrict max_depth to 10. While deeper trees lower training error, 
+    # EV cycles possess intrinsic noise (weather/traffic spikes) that deep trees 
+    # mistakenly memorize. Depth 10 forces generalization.
+    return RandomForestRegressor(
+        n_estimators=n_estimators,
+        max_depth=10,
+        n_jobs=n_jobs,  # Utilize all CPU cores for training speed
+        random_state=42
+    )
+
+def build_hist_gbm() -> "HistGradientBoostingRegressor":
+    """Bounded-memory alternative: histogram binning keeps fit cost flat in row count and needs no bootstrap copies."""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(max_iter=300, learning_rate=0.1, max_leaf_nodes=31, random_state=42)
+
+@timed("model.evaluate", rows=lambda result, *args, **kwargs: result["Test_Samples"])
+def evaluate_model(model: Any, X: Any, y: Any, rows: Optional[np.ndarray] = None,
+                   chunk_rows: int = 65_536) -> Dict[str, float]:
+    """
+    Scores a fitted model on a holdout set with the project's standard metric trio.
+    rows selects holdout rows out of a (possibly memory-mapped) X; they are gathered and
+    scored in chunks so evaluation never materializes the full holdout matrix.
+    """
+    if rows is None:
+        predictions = model.predict(X)
+    else:
+        predictions = np.concatenate([model.predict(X[rows[i:i + chunk_rows]]) for i in range(0, len(rows), chunk_rows)])
+        y = y[rows]
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    mae = mean_absolute_error(y, predictions)
+    rmse = np.sqrt(mean_squared_error(y, predictions))
+    return {"MAE": mae, "RMSE": rmse, "Test_Samples": len(y)}
+
+@timed("model.train_demand_model", rows=lambda result, X, *args, **kwargs: len(X))
+def train_demand_model(X: Union[pd.DataFrame, np.ndarray], y: Union[pd.Series, np.ndarray],
+                       model: Optional[Any] = None) -> Tuple["RandomForestRegressor", Dict[str, float]]:
     """
     Trains the core Random Forest Regressor targeting EV energy volume demand.
     Limits tree depth to intrinsically prevent overfitting on sparse temporal shards.
+    Pass an unfitted estimator as model to train a different regressor under the same split.
     """
-    if X.empty or y.empty:
+    if len(X) == 0 or len(y) == 0:
         raise ValueError("Cannot train model on empty feature/target arrays.")
 
+    from sklearn.model_selection import train_test_split
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # We restrict max_depth to 10. While deeper trees lower training error, 
-    # EV cycles possess intrinsic noise (weather/traffic spikes) that deep trees 
-    # mistakenly memorize. Depth 10 forces generalization.
-    model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=10,
-        n_jobs=-1,  # Utilize all CPU cores for training speed
-        random_state=42
-    )
+    model = model if model is not None else build_forest()
     
     logger.info(f"Initiated model fitting on {len(X_train)} samples...")
     model.fit(X_train, y_train)
     
     # Validate against holdout set
-    predictions = model.predict(X_test)
-    mae = mean_absolute_error(y_test, predictions)
-    rmse = np.sqrt(mean_squared_error(y_test, predictions))
-    
-    metrics = {"MAE": mae, "RMSE": rmse, "Test_Samples": len(y_test)}
+    metrics = evaluate_model(model, X_test, y_test)
     return model, metrics
 
-def save_model(model: RandomForestRegressor, metrics: Dict[str, float], path: str = "models/rf_demand.pkl") -> None:
+@timed("model.train_on_memmap", rows=lambda result, X, *args, **kwargs: len(X))
+def train_on_memmap(X: np.ndarray, y: np.ndarray, holdout: np.ndarray) -> Tuple["RandomForestRegressor", Dict[str, float]]:
+    """
+    Fits the standard forest directly on a memory-mapped float32 matrix. Holdout rows are masked
+    out with zero sample weight instead of being sliced away, because any fancy-indexed split
+    would copy the whole training matrix into RAM.
+    """
+    if len(X) == 0:
+        raise ValueError("Cannot train model on empty feature/target arrays.")
+
+    model = build_forest()
+    n_train = int((~holdout).sum())
+    logger.info(f"Initiated out-of-core model fitting on {n_train} memory-mapped samples...")
+    model.fit(X, y, sample_weight=(~holdout).astype(np.float64))
+    return model, evaluate_model(model, X, y, rows=np.flatnonzero(holdout))
+
+@timed("model.grow_forest", rows=lambda result, model, X, *args, **kwargs: len(X))
+def grow_forest(model: "RandomForestRegressor", X: Any, y: Any, add_estimators: int = 10,
+                max_estimators: Optional[int] = None) -> Tuple["RandomForestRegressor", int]:
+    """
+    Warm-starts an existing forest: fits add_estimators new trees on (X, y), typically a
+    recent window, while every previously grown tree is kept untouched. If that would push the
+    forest past max_estimators, the oldest trees are retired first so stale regimes age out.
+    Returns the updated model and the number of trees replaced.
+    """
+    if not hasattr(model, "estimators_"):
+        raise ValueError("Incremental training needs a fitted sklearn forest (pickle artifact), not a flat export.")
+    if len(X) == 0:
+        raise ValueError("Cannot grow forest on empty feature/target arrays.")
+
+    existing = len(model.estimators_)
+    target = existing + add_estimators
+    replaced = max(0, target - max_estimators) if max_estimators else 0
+    if replaced:
+        # estimators_ is in fit order, so the head holds the trees grown on the oldest data
+        model.estimators_ = model.estimators_[replaced:]
+
+    model.set_params(warm_start=True, n_estimators=target - replaced)
+    logger.info(f"Growing forest by {add_estimators} trees on {len(X)} recent samples "
+                f"({existing} existing, {replaced} retired)...")
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+    return model, replaced
+
+def save_training_set(path: str, X: np.ndarray, y: np.ndarray, times: np.ndarray, station_ids: np.ndarray) -> None:
+    """Persists the feature/target matrix behind an artifact so later runs can append instead of rebuilding."""
+    target_path = Path(path)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(target_path, "wb") as f:
+        np.savez(f, X=X, y=y, time=times.astype("datetime64[ns]"), station_id=station_ids)
+    logger.info(f"Training set of {len(y)} rows stored at {target_path}")
+
+def load_training_set(path: str) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        return {key: npz[key] for key in ("X", "y", "time", "station_id")}
+
+class FlatForest:
+    """
+    Dependency-free inference engine for a fitted RandomForestRegressor.
+    Every tree is flattened into shared contiguous node arrays, and a batch is routed through
+    all trees at once: one vectorized gather/compare per depth level instead of sklearn's
+    per-call validation and per-tree joblib dispatch, which dominate tiny-batch latency.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, depth: int, n_features: int,
+                 children: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        # Interleaved [left, right] child table: one gather per level instead of two plus a select.
+        # Flat artifacts persist it so memory-mapped replicas never materialize a private copy.
+        self.children = children if children is not None else interleave_children(left, right)
+
+    @classmethod
+    def from_sklearn(cls, model: "RandomForestRegressor") -> "FlatForest":
+        return cls(**export_forest(model))
+
+    def predict(self, X: Any, chunk_rows: int = 1024, n_threads: Optional[int] = None) -> np.ndarray:
+        # sklearn evaluates splits on float32 inputs; matching that keeps threshold ties identical
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}")
+
+        out = np.empty(len(X), dtype=np.float64)
+        # Chunking bounds the (rows x trees) node-index working set for very large batches.
+        # NumPy's gathers release the GIL, so big batches spread chunks across threads.
+        starts = range(0, len(X), chunk_rows)
+        if len(starts) > 1 and n_threads != 1:
+            with ThreadPoolExecutor(max_workers=n_threads or os.cpu_count()) as pool:
+                list(pool.map(lambda start: self._predict_block(X, out, start, chunk_rows), starts))
+        else:
+            for start in starts:
+                self._predict_block(X, out, start, chunk_rows)
+        return out
+
+    def _predict_block(self, X: np.ndarray, out: np.ndarray, start: int, chunk_rows: int) -> None:
+        block = X[start:start + chunk_rows]
+        flat_block = block.ravel()
+        row_offsets = (np.arange(len(block), dtype=np.intp) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (len(block), len(self.roots)))
+        for _ in range(self.depth):
+            x = np.take(flat_block, row_offsets + np.take(self.feature, nodes))
+            go_right = x > np.take(self.threshold, nodes)
+            nodes = np.take(self.children, 2 * nodes + go_right)
+        out[start:start + len(block)] = np.take(self.value, nodes).mean(axis=1)
+
+def interleave_children(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    return np.stack([left, right], axis=1).ravel()
+
+def export_forest(model: "RandomForestRegressor") -> Dict[str, Any]:
+    """
+    Flattens a fitted forest into contiguous per-node arrays (feature, threshold, left, right,
+    value) with global child offsets, plus the root offset of each tree.
+    Leaves point to themselves so a fixed number of depth steps needs no per-row leaf checks.
+    """
+    if not hasattr(model, "estimators_"):
+        raise ValueError("Cannot export an unfitted forest.")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+        rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+        values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+        offset += n_nodes
+
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "depth": max(estimator.tree_.max_depth for estimator in model.estimators_),
+        "n_features": model.n_features_in_,
+    }
+
+# Flat artifact layout: <dir>/manifest.json plus one uncompressed .npy per node array
+FLAT_MANIFEST = "manifest.json"
+FLAT_FORMAT = "flat-forest"
+FLAT_FORMAT_VERSION = 1
+FLAT_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "children")
+ARTIFACT_VERSION = "1.0"
+ARTIFACT_DESCRIPTION = "Hourly generic load prediction logic"
+
+def _json_default(obj: Any) -> Any:
+    # Metrics routinely arrive as NumPy scalars from sklearn.metrics
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@timed("model.save_model")
+def save_model(model: "RandomForestRegressor", metrics: Dict[str, float], path: str = "models/rf_demand.pkl",
+               artifact_format: str = "pickle", feature_spec: Optional[Dict[str, Any]] = None,
+               metadata: Optional[Dict[str, Any]] = None) -> None:
     """
     Safely serializes the model state to disk alongside its validation metrics,
     allowing inference servers to verify historical performance bounds.
+    artifact_format='flat' writes the pickle-free, memory-mappable directory layout instead.
+    feature_spec (FeatureTransform.to_spec()) pins the exact feature order serving must rebuild;
+    metadata carries run bookkeeping such as the per-station ingestion watermarks.
     """
+    if artifact_format == "flat":
+        save_flat_model(model, metrics, path, feature_spec, metadata)
+        return
+    if artifact_format != "pickle":
+        raise ValueError(f"Unknown artifact format '{artifact_format}'. Expected 'pickle' or 'flat'.")
+
     target_path = Path(path)
     
     # Robustly guarantee output directory exists before dumping binary
@@ -55,8 +275,10 @@ def save_model(model: RandomForestRegressor, metrics: Dict[str, float], path: st
     payload = {
         "model": model, 
         "metrics": metrics,
-        "version": "1.0",
-        "description": "Hourly generic load prediction logic"
+        "features": feature_spec,
+        "metadata": metadata or {},
+        "version": ARTIFACT_VERSION,
+        "description": ARTIFACT_DESCRIPTION
     }
     
     with open(target_path, "wb") as f:
@@ -64,14 +286,103 @@ def save_model(model: RandomForestRegressor, metrics: Dict[str, float], path: st
         
     logger.info(f"Model and telemetry safely encoded to {target_path}")
 
-def load_model(path: str = "models/rf_demand.pkl") -> Optional[Any]:
+def save_flat_model(model: Any, metrics: Dict[str, float], path: str = "models/rf_demand",
+                    feature_spec: Optional[Dict[str, Any]] = None, metadata: Optional[Dict[str, Any]] = None) -> None:
     """
-    Loads pre-trained model. Gracefully returns None instead of throwing 
-    OS-level crashes if the file has not been built yet.
+    Writes the forest as raw NumPy node buffers plus a JSON manifest (metrics, version,
+    per-array SHA-256). Buffers are uncompressed so replicas can memory-map them and share
+    physical pages through the OS page cache instead of each unpickling a private forest.
+    """
+    flat = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+    target_dir = Path(path)
+
+    # Build beside the target and swap in, so a crashed export never leaves a half-written artifact
+    with staged_directory(target_dir) as staging_dir:
+        arrays = {}
+        for name in FLAT_ARRAYS:
+            array = np.ascontiguousarray(getattr(flat, name))
+            np.save(staging_dir / f"{name}.npy", array, allow_pickle=False)
+            arrays[name] = {
+                "file": f"{name}.npy",
+                "dtype": str(array.dtype),
+                "shape": list(array.shape),
+                "sha256": _sha256_file(staging_dir / f"{name}.npy"),
+            }
+
+        manifest = {
+            "format": FLAT_FORMAT,
+            "format_version": FLAT_FORMAT_VERSION,
+            "version": ARTIFACT_VERSION,
+            "description": ARTIFACT_DESCRIPTION,
+            "metrics": metrics,
+            "features": feature_spec,
+            "metadata": metadata or {},
+            "depth": flat.depth,
+            "n_features": flat.n_features,
+            "arrays": arrays,
+        }
+        with open(staging_dir / FLAT_MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+    logger.info(f"Flat model artifact ({len(flat.roots)} trees) safely encoded to {target_dir}")
+
+def is_flat_artifact(path: str) -> bool:
+    target = Path(path)
+    if target.name == FLAT_MANIFEST:
+        return target.is_file()
+    return (target / FLAT_MANIFEST).is_file()
+
+def load_flat_artifact(path: str, mmap: bool = True, verify: bool = True) -> Dict[str, Any]:
+    """
+    Loads a flat artifact without ever touching pickle. With mmap=True the node arrays are
+    read-only memory maps, so N replicas on one host share a single copy of the forest.
+    Raises ValueError on an unknown format or a checksum/shape mismatch.
+    """
+    target = Path(path)
+    root = target.parent if target.name == FLAT_MANIFEST else target
+    with open(root / FLAT_MANIFEST) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != FLAT_FORMAT or manifest.get("format_version", 0) > FLAT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format')} v{manifest.get('format_version')} at {root}")
+
+    arrays = {}
+    for name in FLAT_ARRAYS:
+        spec = manifest["arrays"][name]
+        array_path = root / spec["file"]
+        # Hashing streams the file once, which also pre-warms the page cache the maps will hit
+        if verify and _sha256_file(array_path) != spec["sha256"]:
+            raise ValueError(f"Checksum mismatch for {array_path}; artifact is corrupted or tampered with.")
+        array = np.load(array_path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"{array_path} does not match its manifest entry.")
+        arrays[name] = array
+
+    model = FlatForest(depth=manifest["depth"], n_features=manifest["n_features"], **arrays)
+    return {
+        "model": model,
+        "metrics": manifest.get("metrics", {}),
+        "features": manifest.get("features"),
+        "metadata": manifest.get("metadata", {}),
+        "version": manifest.get("version"),
+        "description": manifest.get("description"),
+    }
+
+@timed("model.load_artifact")
+def load_artifact(path: str = "models/rf_demand.pkl") -> Optional[Dict[str, Any]]:
+    """
+    Loads a model artifact of either format, auto-detected from the path, and returns its
+    payload dict (model, metrics, version, ...). Returns None when missing or unreadable.
     """
     if not os.path.exists(path):
         logger.warning(f"Attempted to load missing model architecture at {path}.")
         return None
+
+    if is_flat_artifact(path):
+        try:
+            return load_flat_artifact(path)
+        except Exception as e:
+            logger.error(f"Unreadable flat model artifact at {path}. Exception: {e}")
+            return None
         
     try:
         with open(path, "rb") as f:
@@ -80,8 +391,17 @@ def load_model(path: str = "models/rf_demand.pkl") -> Optional[Any]:
             # Legacy support: Some early scripts might just dump raw model instances
             # instead of our dictionary wrapper. Handle both.
             if isinstance(data, dict) and "model" in data:
-                return data["model"]
-            return data
+                return data
+            return {"model": data, "metrics": {}}
     except Exception as e:
         logger.error(f"Corrupted binary pickle stream at {path}. Exception: {e}")
         return None
+
+def load_model(path: str = "models/rf_demand.pkl") -> Optional[Any]:
+    """
+    Loads pre-trained model. Gracefully returns None instead of throwing 
+    OS-level crashes if the file has not been built yet.
+    Pickle files and flat artifact directories are both accepted.
+    """
+    artifact = load_artifact(path)
+    return artifact["model"] if artifact is not None else None
@@ -1,38 +1,114 @@
+import os
+import time
 import logging
 import pandas as pd
 import numpy as np
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.preprocess_cache import DEFAULT_MAX_BYTES, enforce_size_cap, load_cached_frame, store_cached_frame
+from app.profiling import timed
 
 # Configure local module logger
 logger = logging.getLogger(__name__)
 
+# Bump whenever load/aggregate/engineer semantics change so stale cache entries are never reused
+PIPELINE_VERSION = "2"
+
+# Known charge_5min schema. Pile counts fit comfortably in int16 and float32 carries far more
+# precision than the meters report, roughly halving the in-memory footprint versus float64.
+TELEMETRY_DTYPES = {
+    'busy': 'int16',
+    'idle': 'int16',
+    's_price': 'float32',
+    'e_price': 'float32',
+    'duration': 'float32',
+    'volume': 'float32',
+}
+TELEMETRY_COLUMNS = ['time'] + list(TELEMETRY_DTYPES)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Station attributes (coordinates, pile counts, TAZID zone) shipped with the UrbanEV dataset
+DEFAULT_STATION_INFO_PATH = "data/raw/UrbanEVDataset/UrbanEVDataset/20220901-20230228_zone-cleaned-aggregated/station_information.csv"
+
+def _read_typed_telemetry(filepath: str) -> pd.DataFrame:
+    """
+    Fast path: reads only the pipeline's columns with compact dtypes and parses timestamps
+    inside the reader. Raises ValueError whenever the file deviates from the known schema.
+    """
+    # A failed int16 cast emits a RuntimeWarning before raising; the fallback handles it quietly
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        df = pd.read_csv(
+            filepath,
+            usecols=lambda col: col in TELEMETRY_COLUMNS,
+            dtype=TELEMETRY_DTYPES,
+            parse_dates=['time'],
+            date_format=TIME_FORMAT,
+        )
+    # Rows that miss the explicit format leave the column as strings rather than raising
+    if not pd.api.types.is_datetime64_any_dtype(df['time']):
+        raise ValueError("timestamps do not match the expected format")
+    return df
+
+def _read_tolerant_telemetry(filepath: str) -> pd.DataFrame:
+    """Slow path: infers every dtype and coerces unparseable timestamps to NaT."""
+    df = pd.read_csv(filepath)
+    if 'time' not in df.columns:
+        raise ValueError(f"CRITICAL: Raw data at {filepath} lacks required 'time' column.")
+    df['time'] = pd.to_datetime(df['time'], errors='coerce')
+    return df
+
+@timed("preprocess.load_charging_data")
 def load_charging_data(filepath: str) -> pd.DataFrame:
     """
     Safely loads and validates raw 5-minute station charging telemetry.
     Drops inherently duplicate telemetry scans to preserve aggregate sums.
     """
+    start = time.perf_counter()
     try:
-        df = pd.read_csv(filepath)
+        try:
+            df = _read_typed_telemetry(filepath)
+            path_label = "typed"
+        except (ValueError, TypeError, OverflowError) as e:
+            # Blank pile counts, stray header rows or odd timestamp layouts land here
+            logger.debug(f"Typed schema rejected {filepath} ({e}); using tolerant parser")
+            df = _read_tolerant_telemetry(filepath)
+            path_label = "tolerant"
     except FileNotFoundError:
         logger.error(f"Data file missing at path: {filepath}")
         raise
 
-    if 'time' not in df.columns:
-        raise ValueError(f"CRITICAL: Raw data at {filepath} lacks required 'time' column.")
-
     # Drop explicit duplicates caused by network multi-transmits
     initial_len = len(df)
     df.drop_duplicates(inplace=True)
     if len(df) < initial_len:
         logger.debug(f"Removed {initial_len - len(df)} duplicate telemetry rows from {filepath}")
 
-    # Standardize time dimension
-    df['time'] = pd.to_datetime(df['time'], errors='coerce')
-    
     # Drop rows where timestamp parsing completely failed
     df.dropna(subset=['time'], inplace=True)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Parsed {initial_len} rows from {os.path.basename(filepath)} via {path_label} reader "
+                f"({initial_len / max(elapsed, 1e-9):,.0f} rows/s)")
     return df
 
+# Hours a station may stay silent before its gap is treated as an outage rather than forward-filled
+GAP_FILL_LIMIT = 2
+
+def _hourly_agg_funcs(columns: Iterable[str]) -> dict:
+    """Not all telemetry stations report 'idle' or 'duration'. Use safe-get aggregation."""
+    agg_funcs = {}
+    if 'busy' in columns: agg_funcs['busy'] = 'mean'
+    if 'idle' in columns: agg_funcs['idle'] = 'mean'
+    if 's_price' in columns: agg_funcs['s_price'] = 'mean'
+    if 'e_price' in columns: agg_funcs['e_price'] = 'mean'
+    if 'duration' in columns: agg_funcs['duration'] = 'sum'
+    if 'volume' in columns: agg_funcs['volume'] = 'sum'
+    return agg_funcs
+
+@timed("preprocess.aggregate_to_hourly", rows=lambda result, df: len(df))
 def aggregate_to_hourly(df: pd.DataFrame) -> pd.DataFrame:
     """
     Downsamples the volatile 5-minute telemetry into stable 1-hour chunks.
@@ -44,26 +120,72 @@ def aggregate_to_hourly(df: pd.DataFrame) -> pd.DataFrame:
 
     # Set index for resampler
     df.set_index('time', inplace=True)
-    
-    # Not all telemetry stations report 'idle' or 'duration'. Use safe-get aggregation.
-    agg_funcs = {}
-    if 'busy' in df.columns: agg_funcs['busy'] = 'mean'
-    if 'idle' in df.columns: agg_funcs['idle'] = 'mean'
-    if 's_price' in df.columns: agg_funcs['s_price'] = 'mean'
-    if 'e_price' in df.columns: agg_funcs['e_price'] = 'mean'
-    if 'duration' in df.columns: agg_funcs['duration'] = 'sum'
-    if 'volume' in df.columns: agg_funcs['volume'] = 'sum'
+    agg_funcs = _hourly_agg_funcs(df.columns)
     
     # Execute the aggregation and restore index to a normal column
     hourly_df = df.resample('h').agg(agg_funcs).reset_index()
     
     # Forward-fill minor gaps (1-2 hours) where a station dropped offline,
     # but strictly drop spans larger than that to prevent hallucinated data.
-    hourly_df.ffill(limit=2, inplace=True)
+    hourly_df.ffill(limit=GAP_FILL_LIMIT, inplace=True)
     hourly_df.dropna(inplace=True)
     
-    return hourly_df
+    # A fresh RangeIndex, as the streaming path and cache hits return, so no caller sees gaps
+    return hourly_df.reset_index(drop=True)
+
+@timed("preprocess.aggregate_network_hourly", rows=lambda result, df: len(df))
+def aggregate_network_hourly(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Network-wide equivalent of aggregate_to_hourly for one long frame keyed by 'station_id'.
+    Every station is binned in a single grouped pass over (station_id, floored hour) instead
+    of paying set_index/resample overhead per station; output rows match the per-station
+    function exactly, with an extra leading 'station_id' column.
+    """
+    if df.empty:
+        logger.warning("Empty DataFrame passed to aggregate_network_hourly. Returning empty subset.")
+        return df
+
+    agg_funcs = _hourly_agg_funcs(df.columns)
+
+    # resample() sums each bin in time order; float32 sums are order-sensitive, so shuffled
+    # input must be put in the same order to stay bit-identical with the per-station path.
+    # The check is O(n) and skips the sort for the common concat-of-sorted-stations layout.
+    station_ids = df['station_id'].to_numpy()
+    times = df['time'].to_numpy()
+    same_station = station_ids[1:] == station_ids[:-1]
+    contiguous = (len(station_ids) - same_station.sum()) == df['station_id'].nunique()
+    if not contiguous or (times[1:][same_station] < times[:-1][same_station]).any():
+        df = df.sort_values(['station_id', 'time'], kind='stable')
+
+    hours = df['time'].dt.floor('h')
+    grouped = df.groupby([df['station_id'], hours], sort=True).agg(agg_funcs)
+    grouped.index.names = ['station_id', 'time']
+
+    # resample() emits every hour between a station's first and last reading, so rebuild
+    # that dense per-station calendar with repeat/arange rather than looping over stations.
+    bounds = grouped.index.to_frame(index=False).groupby('station_id')['time'].agg(['min', 'max'])
+    spans = ((bounds['max'] - bounds['min']) // pd.Timedelta(hours=1)).to_numpy(dtype=np.int64) + 1
+    starts = np.cumsum(spans) - spans
+    offsets = np.arange(spans.sum()) - np.repeat(starts, spans)
+    dense_index = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(bounds.index.to_numpy(), spans),
+            np.repeat(bounds['min'].to_numpy(), spans) + offsets * np.timedelta64(1, 'h'),
+        ],
+        names=['station_id', 'time'],
+    )
+    hourly_df = grouped.reindex(dense_index)
 
+    # Empty hours SUM to zero under resample() but MEAN to NaN; mirror that before gap-filling
+    sum_cols = [col for col, func in agg_funcs.items() if func == 'sum']
+    hourly_df[sum_cols] = hourly_df[sum_cols].fillna(0)
+
+    # Gap-fill strictly within each station so one station's readings never bleed into the next
+    hourly_df = hourly_df.groupby(level='station_id').ffill(limit=GAP_FILL_LIMIT)
+    hourly_df.dropna(inplace=True)
+    return hourly_df.reset_index()
+
+@timed("preprocess.engineer_features")
 def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Injects critical temporal dimensions into the dataset.
@@ -89,9 +211,174 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     
     return df
 
-def process_station_pipeline(filepath: str) -> pd.DataFrame:
-    """End-to-end wrapper executing the unified preprocessing pipeline for a single station."""
-    df = load_charging_data(filepath)
-    hourly_df = aggregate_to_hourly(df)
-    final_df = engineer_features(hourly_df)
+# Rows per CSV chunk in streaming mode (~10 MB of parsed telemetry with the compact dtypes)
+DEFAULT_CHUNKSIZE = 500_000
+
+def _coerce_telemetry_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the typed schema to one streamed chunk. Columns that cannot take their compact
+    dtype (e.g. blank pile counts) degrade to float64 instead of failing the whole stream.
+    """
+    if 'time' not in chunk.columns:
+        raise ValueError("CRITICAL: Streamed telemetry lacks required 'time' column.")
+    raw_time = chunk['time']
+    parsed = pd.to_datetime(raw_time, format=TIME_FORMAT, errors='coerce')
+    # Mirror load_charging_data's tolerant fallback: a timestamp layout other than TIME_FORMAT
+    # is inferred like the in-memory path does, rather than coerced to NaT and silently dropped
+    if (parsed.isna() & raw_time.notna()).any():
+        parsed = pd.to_datetime(raw_time, errors='coerce')
+    chunk['time'] = parsed
+    for col, dtype in TELEMETRY_DTYPES.items():
+        if col not in chunk.columns:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        chunk[col] = values.astype(dtype) if not values.isna().any() else values.astype('float64')
+    return chunk
+
+def stream_hourly_aggregates(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """
+    Out-of-core counterpart of load_charging_data + aggregate_to_hourly.
+    Reads the CSV in bounded chunks and yields hourly frames as soon as their hour is closed,
+    so peak memory tracks chunksize rather than file size.
+
+    Telemetry must be time-ordered at hour granularity (as the UrbanEV exports are): the raw
+    rows of the still-open hour are carried into the next chunk, which is what lets duplicates
+    and hour buckets that straddle a chunk boundary resolve exactly like the in-memory path.
+    """
+    agg_funcs = None
+    carry = None          # raw rows of the latest (still open) hour
+    context = None        # last GAP_FILL_LIMIT hourly rows *before* gap-filling
+    next_hour = None      # first hour not yet emitted
+
+    def close_hours(rows: pd.DataFrame) -> Optional[pd.DataFrame]:
+        nonlocal context, next_hour
+        if rows.empty:
+            return None
+        binned = rows.groupby(rows['time'].dt.floor('h').rename('time'), sort=True).agg(agg_funcs)
+        first = binned.index.min() if next_hour is None else next_hour
+        hourly = binned.reindex(pd.date_range(first, binned.index.max(), freq='h', name='time'))
+
+        # Empty hours SUM to zero under resample() but MEAN to NaN
+        sum_cols = [col for col, func in agg_funcs.items() if func == 'sum']
+        hourly[sum_cols] = hourly[sum_cols].fillna(0)
+
+        # Prepend the unfilled tail of earlier hours so ffill(limit) sees the same history it
+        # would in one pass; only GAP_FILL_LIMIT rows can ever influence the new ones.
+        combined = hourly if context is None else pd.concat([context, hourly])
+        filled = combined.ffill(limit=GAP_FILL_LIMIT).iloc[len(combined) - len(hourly):]
+        context = combined.tail(GAP_FILL_LIMIT)
+        next_hour = hourly.index.max() + pd.Timedelta(hours=1)
+
+        filled = filled.dropna().reset_index()
+        return filled if not filled.empty else None
+
+    reader = pd.read_csv(filepath, usecols=lambda col: col in TELEMETRY_COLUMNS, chunksize=chunksize)
+    for chunk in reader:
+        chunk = _coerce_telemetry_chunk(chunk)
+        buffer = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        buffer = buffer.drop_duplicates().dropna(subset=['time'])
+        if buffer.empty:
+            continue
+        if agg_funcs is None:
+            agg_funcs = _hourly_agg_funcs(buffer.columns)
+
+        hours = buffer['time'].dt.floor('h')
+        if next_hour is not None and (hours < next_hour).any():
+            raise ValueError(f"Telemetry in {filepath} is not time-ordered; hours before {next_hour} "
+                             f"reappeared after being emitted. Use process_station_pipeline instead.")
+
+        open_hour = hours.max()
+        carry = buffer[hours == open_hour]
+        closed = close_hours(buffer[hours < open_hour])
+        if closed is not None:
+            yield closed
+
+    if carry is not None:
+        closed = close_hours(carry)
+        if closed is not None:
+            yield closed
+
+def stream_station_pipeline(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Streaming variant of process_station_pipeline yielding feature-engineered hourly batches."""
+    for hourly_df in stream_hourly_aggregates(filepath, chunksize):
+        yield engineer_features(hourly_df)
+
+@timed("preprocess.station_pipeline")
+def process_station_pipeline(filepath: str, cache_dir: Optional[str] = None,
+                             chunksize: Optional[int] = None, hash_content: bool = False,
+                             enforce_cache_cap: bool = True) -> pd.DataFrame:
+    """
+    End-to-end wrapper executing the unified preprocessing pipeline for a single station.
+    When cache_dir is given, an unchanged source file is served from the columnar cache
+    and the CSV path is skipped entirely. A chunksize routes the raw read through the
+    streaming path, so only the (12x smaller) hourly output is ever held in full.
+    hash_content keys the cache on the file's bytes as well, for sources whose mtimes lie.
+    enforce_cache_cap=False leaves the cache size cap to a caller storing many stations.
+    """
+    if cache_dir is not None:
+        cached = load_cached_frame(filepath, PIPELINE_VERSION, cache_dir, hash_content)
+        if cached is not None:
+            logger.debug(f"Preprocess cache hit for {filepath}")
+            return cached
+
+    if chunksize is not None:
+        batches = list(stream_station_pipeline(filepath, chunksize))
+        final_df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+    else:
+        df = load_charging_data(filepath)
+        hourly_df = aggregate_to_hourly(df)
+        final_df = engineer_features(hourly_df)
+
+    if cache_dir is not None:
+        store_cached_frame(filepath, PIPELINE_VERSION, final_df, cache_dir,
+                           max_bytes=DEFAULT_MAX_BYTES if enforce_cache_cap else None, hash_content=hash_content)
     return final_df
+
+def process_stations_parallel(filepaths: Iterable[str], max_workers: Optional[int] = None,
+                              cache_dir: Optional[str] = None,
+                              chunksize: Optional[int] = None,
+                              hash_content: bool = False) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Fans process_station_pipeline out over a process pool and yields (filepath, frame)
+    pairs as each station finishes. Missing or corrupted stations are logged and skipped
+    so that one bad export never aborts a network-wide ingestion run.
+    """
+    pending = []
+    for path in filepaths:
+        if not os.path.exists(path):
+            logger.warning(f"Target dataset {os.path.basename(path)} skipped (File not found).")
+            continue
+        pending.append(path)
+
+    if not pending:
+        return
+
+    try:
+        yield from _process_pending(pending, max_workers, cache_dir, chunksize, hash_content)
+    finally:
+        # Once per batch: enforcing the cap on every store rescans the whole cache, O(N^2) on a cold ingest
+        if cache_dir is not None:
+            enforce_size_cap(cache_dir, DEFAULT_MAX_BYTES)
+
+def _process_pending(pending: List[str], max_workers: Optional[int], cache_dir: Optional[str],
+                     chunksize: Optional[int], hash_content: bool) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Runs the pipeline over existing paths, in-process or across a pool, leaving the cache cap to the caller."""
+    # A single worker (or a single file) gains nothing from process spawn + pickling overhead.
+    if max_workers == 1 or len(pending) == 1:
+        for path in pending:
+            try:
+                yield path, process_station_pipeline(path, cache_dir, chunksize, hash_content, enforce_cache_cap=False)
+            except Exception as e:
+                logger.error(f"Failed to process {os.path.basename(path)} due to data corruption/schema mismatch. Err: {e}")
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(process_station_pipeline, path, cache_dir, chunksize, hash_content, False): path
+                   for path in pending}
+        # Gather in completion order so one huge station never stalls the smaller ones behind it
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result()
+            except Exception as e:
+                logger.error(f"Failed to process {os.path.basename(path)} due to data corruption/schema mismatch. Err: {e}")
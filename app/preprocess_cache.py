@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import logging
+import tempfile
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, List
+
+from app.columnar import load_frame_npz, save_frame_npz
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache/preprocess"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB keeps a full-network cache on a laptop SSD
+
+def cache_key(filepath: str, pipeline_version: str, hash_content: bool = False) -> str:
+    """
+    Derives a stable cache key for a raw telemetry file.
+    mtime/size catch ordinary re-exports cheaply; hash_content additionally digests the
+    bytes for sources whose timestamps cannot be trusted (e.g. rsync --times off).
+    """
+    stat = os.stat(filepath)
+    parts = {
+        "path": os.path.abspath(filepath),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "pipeline_version": pipeline_version,
+    }
+    if hash_content:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        parts["content_sha256"] = digest.hexdigest()
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def _entry_path(cache_dir: str, key: str) -> Path:
+    return Path(cache_dir) / f"{key}.npz"
+
+def load_cached_frame(filepath: str, pipeline_version: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                      hash_content: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Returns the cached hourly frame for filepath, or None on a miss.
+    Each column is stored as its own uncompressed NumPy array, so a hit is a straight
+    buffer read with no CSV tokenizing or datetime parsing.
+    """
+    entry = _entry_path(cache_dir, cache_key(filepath, pipeline_version, hash_content))
+    if not entry.exists():
+        return None
+
+    try:
+        df = load_frame_npz(entry)
+    except Exception as e:
+        # A torn write or a format from an older numpy is just a miss; drop it and rebuild.
+        logger.warning(f"Discarding unreadable cache entry {entry.name}. Exception: {e}")
+        entry.unlink(missing_ok=True)
+        return None
+
+    # Refresh mtime so size-cap eviction behaves as least-recently-used
+    os.utime(entry)
+    return df
+
+def store_cached_frame(filepath: str, pipeline_version: str, df: pd.DataFrame,
+                       cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                       hash_content: bool = False) -> None:
+    """
+    Persists a processed frame column-by-column and enforces the cache size cap.
+    Writes go to a temp file first and are renamed into place, so concurrent pool
+    workers never observe a half-written entry. max_bytes=None skips the cap, for batch
+    callers that run enforce_size_cap once at the end instead of rescanning per store.
+    """
+    target_dir = Path(cache_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    entry = _entry_path(cache_dir, cache_key(filepath, pipeline_version, hash_content))
+
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            save_frame_npz(df, f)
+        os.replace(tmp_path, entry)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    if max_bytes is not None:
+        enforce_size_cap(cache_dir, max_bytes)
+
+def _entries(cache_dir: str) -> List[Path]:
+    root = Path(cache_dir)
+    if not root.exists():
+        return []
+    return list(root.glob("*.npz"))
+
+def enforce_size_cap(cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """Evicts least-recently-used entries until the cache fits max_bytes. Returns the number evicted."""
+    stats = []
+    for entry in _entries(cache_dir):
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue  # Evicted concurrently by a sibling worker
+        stats.append((st.st_mtime, st.st_size, entry))
+
+    total = sum(size for _, size, _ in stats)
+    evicted = 0
+    for _, size, entry in sorted(stats, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        entry.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+
+    if evicted:
+        logger.info(f"Evicted {evicted} preprocess cache entries to respect {max_bytes} byte cap")
+    return evicted
+
+def clear_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> int:
+    """Invalidates every cached frame. Returns the number of entries removed."""
+    entries = _entries(cache_dir)
+    for entry in entries:
+        entry.unlink(missing_ok=True)
+    return len(entries)
+
+def cache_stats(cache_dir: str = DEFAULT_CACHE_DIR) -> Dict[str, int]:
+    entries = _entries(cache_dir)
+    return {"entries": len(entries), "bytes": sum(e.stat().st_size for e in entries if e.exists())}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the preprocessed station cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--clear", action="store_true", help="Remove every cached station frame.")
+    action.add_argument("--max-bytes", type=int, help="Evict least-recently-used entries down to this size.")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        print(f"Removed {clear_cache(args.cache_dir)} cache entries from {args.cache_dir}")
+    elif args.max_bytes is not None:
+        print(f"Evicted {enforce_size_cap(args.cache_dir, args.max_bytes)} cache entries from {args.cache_dir}")
+
+    stats = cache_stats(args.cache_dir)
+    print(f"{args.cache_dir}: {stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MiB")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
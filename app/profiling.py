@@ -0,0 +1,273 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import atexit
+import cProfile
+import logging
+import argparse
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Unix-only; peak RSS is simply not reported where it is missing (e.g. Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Inherited by pool workers, so stages timed in child processes land in the same JSONL file
+PROFILE_JSONL_ENV = "EV_PROFILE_JSONL"
+PROFILE_TRACEMALLOC_ENV = "EV_PROFILE_TRACEMALLOC"
+
+def peak_rss_mb() -> Optional[Dict[str, float]]:
+    """Peak resident set size of this process and of its (joined) worker children, in MiB; None where unavailable."""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    scale = 1 / 1024 ** 2 if sys.platform == "darwin" else 1 / 1024
+    return {
+        "Peak_RSS_MB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "Peak_Worker_RSS_MB": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size right now (Linux /proc); None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+class StageRecord:
+    """One timed execution of a pipeline stage. Callers may set `rows` inside the block."""
+
+    __slots__ = ("stage", "rows", "wall_s", "rss_mb", "peak_rss_mb", "traced_peak_mb", "_child_traced_peak")
+
+    def __init__(self, stage: str, rows: Optional[int] = None):
+        self.stage = stage
+        self.rows = rows
+        self.wall_s = 0.0
+        self.rss_mb: Optional[float] = None
+        self.peak_rss_mb: Optional[float] = None
+        self.traced_peak_mb: Optional[float] = None
+        self._child_traced_peak = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "stage": self.stage,
+            "wall_s": round(self.wall_s, 6),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / self.wall_s, 1) if self.rows is not None and self.wall_s > 0 else None,
+            "rss_mb": None if self.rss_mb is None else round(self.rss_mb, 1),
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+        }
+        if self.traced_peak_mb is not None:
+            record["traced_peak_mb"] = round(self.traced_peak_mb, 2)
+        return record
+
+class StageRegistry:
+    """
+    Process-wide aggregate of every timed stage (calls, seconds, rows, worst peak RSS), plus the
+    optional JSON-lines sink that receives each individual record as it completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._local = threading.local()
+
+    def stack(self) -> List[StageRecord]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def record(self, rec: StageRecord) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(rec.stage, {"calls": 0, "seconds": 0.0, "rows": 0, "peak_rss_mb": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] += rec.wall_s
+            totals["rows"] += rec.rows or 0
+            totals["peak_rss_mb"] = max(totals["peak_rss_mb"], rec.peak_rss_mb or 0.0)
+
+        path = os.environ.get(PROFILE_JSONL_ENV)
+        if path:
+            # One short O_APPEND write per record keeps lines intact across concurrent workers
+            line = json.dumps(rec.to_dict()) + "\n"
+            with open(path, "a") as f:
+                f.write(line)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+REGISTRY = StageRegistry()
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[StageRecord]:
+    """
+    Times a block as pipeline stage `name`, recording wall time, rows/s and memory. Set
+    `record.rows` inside the block when the row count is only known afterwards. With tracemalloc
+    on, traced_peak_mb is the stage's own allocation peak, nested stages included.
+    """
+    rec = StageRecord(name, rows)
+    stack = REGISTRY.stack()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # reset_peak would lose the enclosing stage's peak so far; fold it into the parent first
+        if stack:
+            stack[-1]._child_traced_peak = max(stack[-1]._child_traced_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    stack.append(rec)
+    start = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec.wall_s = time.perf_counter() - start
+        stack.pop()
+        if tracing and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], rec._child_traced_peak)
+            rec.traced_peak_mb = peak / 1024 ** 2
+            if stack:
+                stack[-1]._child_traced_peak = max(stack[-1]._child_traced_peak, peak)
+        rec.rss_mb = _current_rss_mb()
+        peaks = peak_rss_mb()
+        rec.peak_rss_mb = peaks["Peak_RSS_MB"] if peaks else None
+        REGISTRY.record(rec)
+
+def _default_rows(result: Any, *args: Any, **kwargs: Any) -> Optional[int]:
+    """Frames and arrays count their own rows; anything else (tuples, dicts, None) reports none."""
+    return len(result) if hasattr(result, "shape") and getattr(result, "ndim", 0) >= 1 else None
+
+def timed(name: str, rows: Optional[Callable[..., Optional[int]]] = None) -> Callable:
+    """
+    Decorator form of stage(). `rows(result, *args, **kwargs)` derives the row count from the
+    call; by default a returned DataFrame/ndarray's length is used.
+    """
+    count_rows = rows or _default_rows
+
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name) as rec:
+                result = fn(*args, **kwargs)
+                rec.rows = count_rows(result, *args, **kwargs)
+            return result
+        return wrapper
+    return decorate
+
+def prometheus_text(snapshot: Optional[Dict[str, Dict[str, float]]] = None, prefix: str = "ev_stage") -> str:
+    """Renders stage totals in the Prometheus text exposition format."""
+    snapshot = REGISTRY.snapshot() if snapshot is None else snapshot
+    series = [
+        ("calls_total", "counter", "Completed executions of the stage.", "calls"),
+        ("seconds_total", "counter", "Wall-clock seconds spent in the stage.", "seconds"),
+        ("rows_total", "counter", "Rows processed by the stage.", "rows"),
+        ("peak_rss_megabytes", "gauge", "Highest process peak RSS observed at stage exit.", "peak_rss_mb"),
+    ]
+    lines = []
+    for suffix, kind, help_text, key in series:
+        metric = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for stage_name, totals in sorted(snapshot.items()):
+            lines.append(f'{metric}{{stage="{stage_name}"}} {totals[key]:g}')
+    return "\n".join(lines) + "\n"
+
+def summary_table(snapshot: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+    """Human-readable per-stage totals for the end of a CLI run, slowest stage first."""
+    snapshot = REGISTRY.snapshot() if snapshot is None else snapshot
+    lines = [f"{'stage':<36} {'calls':>6} {'seconds':>9} {'rows/s':>13} {'peak RSS MB':>12}"]
+    for name, t in sorted(snapshot.items(), key=lambda item: -item[1]["seconds"]):
+        rate = f"{t['rows'] / t['seconds']:,.0f}" if t["rows"] and t["seconds"] > 0 else "-"
+        lines.append(f"{name:<36} {int(t['calls']):>6} {t['seconds']:>9.3f} {rate:>13} {t['peak_rss_mb']:>12.1f}")
+    return "\n".join(lines)
+
+@contextmanager
+def profiling_session(jsonl_path: Optional[str] = None, cprofile_path: Optional[str] = None,
+                      trace_memory: bool = False, top: int = 25) -> Iterator[None]:
+    """
+    Per-run switches for the heavier diagnostics, for a CLI to wrap its main() with.
+      jsonl_path    - append every stage record (from this process and its pool workers) here
+      cprofile_path - run under cProfile, dump pstats there and log the `top` hottest functions
+      trace_memory  - enable tracemalloc so stages also report their traced allocation peak
+    Stage timing itself is always on; it costs two clock reads and a getrusage per stage.
+    """
+    session_start = time.time()
+    previous_env = {key: os.environ.get(key) for key in (PROFILE_JSONL_ENV, PROFILE_TRACEMALLOC_ENV)}
+    if jsonl_path:
+        os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+        os.environ[PROFILE_JSONL_ENV] = os.path.abspath(jsonl_path)
+    if trace_memory:
+        os.environ[PROFILE_TRACEMALLOC_ENV] = "1"
+        tracemalloc.start()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            logger.info(f"cProfile stats written to {cprofile_path}; hottest calls:\n{out.getvalue()}")
+        if trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        # Pool workers only report through the JSONL sink, so summarize from it when there is one
+        snapshot = summarize_jsonl(jsonl_path, since=session_start) if jsonl_path else REGISTRY.snapshot()
+        if snapshot:
+            logger.info("--- Stage Profile ---\n" + summary_table(snapshot))
+
+def summarize_jsonl(path: str, since: float = 0.0) -> Dict[str, Dict[str, float]]:
+    """Folds JSONL stage records (from any number of processes) written at or after `since` into totals."""
+    totals: Dict[str, Dict[str, float]] = {}
+    if not os.path.exists(path):
+        return totals
+    with open(path) as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec["ts"] < since:
+                continue
+            t = totals.setdefault(rec["stage"], {"calls": 0, "seconds": 0.0, "rows": 0, "peak_rss_mb": 0.0})
+            t["calls"] += 1
+            t["seconds"] += rec["wall_s"]
+            t["rows"] += rec["rows"] or 0
+            t["peak_rss_mb"] = max(t["peak_rss_mb"], rec["peak_rss_mb"] or 0.0)
+    return totals
+
+def add_profiling_args(parser: argparse.ArgumentParser) -> None:
+    """The per-run profiling switches shared by every CLI entry point."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile-jsonl", default=None, help="Append per-stage timing/memory records (JSON lines) here.")
+    group.add_argument("--cprofile", default=None, help="Run under cProfile and write pstats to this path.")
+    group.add_argument("--tracemalloc", action="store_true", help="Report each stage's traced Python/NumPy allocation peak.")
+
+def session_from_args(args: argparse.Namespace):
+    return profiling_session(args.profile_jsonl, args.cprofile, args.tracemalloc)
+
+def _start_worker_tracing() -> None:
+    # Spawned pool workers re-import this module; honour the parent's tracemalloc switch
+    if os.environ.get(PROFILE_TRACEMALLOC_ENV) and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        atexit.register(tracemalloc.stop)
+
+_start_worker_tracing()
@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.columnar import load_frame_npz, save_frame_npz, staged_directory
+from app.forecast import load_forecast
+from app.model import load_training_set
+from app.preprocess import DEFAULT_STATION_INFO_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROLLUP_DIR = "models/rollups"
+ROLLUP_MANIFEST = "manifest.json"
+ROLLUP_VERSION = 1
+TOP_N_STATIONS = 10
+# Filled in by forecast runs only; history refreshes carry them over unchanged
+PEAK_COLUMNS = ['peak_predicted_volume', 'peak_time']
+# Occupancy measures per table, with the keys a table's rows are matched on
+OCCUPANCY_COLUMNS = {'network': ([], 'hist_mean_occupancy'), 'zones': (['TAZID'], 'hist_mean_occupancy'),
+                     'zone_hourly': (['TAZID', 'hour'], 'mean_occupancy')}
+
+def _occupancy(hourly: pd.DataFrame) -> pd.Series:
+    """Share of piles busy in each station-hour; NaN where the station does not report idle."""
+    if 'busy' not in hourly.columns or 'idle' not in hourly.columns:
+        return pd.Series(np.nan, index=hourly.index)
+    piles = hourly['busy'] + hourly['idle']
+    return (hourly['busy'] / piles.where(piles > 0)).astype(np.float32)
+
+def _with_zones(frame: pd.DataFrame, stations: pd.DataFrame) -> pd.DataFrame:
+    zones = stations.set_index('station_id')['TAZID']
+    frame = frame.assign(TAZID=frame['station_id'].map(zones))
+    return frame[frame['TAZID'].notna()].astype({'TAZID': np.int64})
+
+def zone_hourly_history(hourly: pd.DataFrame, stations: pd.DataFrame) -> pd.DataFrame:
+    """
+    Historical demand profile per (TAZID, hour of day): mean station-hour volume and occupancy.
+    `hourly` is the preprocessed master table (station_id, time, volume, optionally busy/idle).
+    """
+    frame = _with_zones(hourly[['station_id', 'time', 'volume']].assign(occupancy=_occupancy(hourly)), stations)
+    frame['hour'] = frame['time'].dt.hour.astype(np.int8)
+    return (frame.groupby(['TAZID', 'hour'], sort=True)
+            .agg(mean_volume=('volume', 'mean'), mean_occupancy=('occupancy', 'mean'),
+                 station_hours=('volume', 'size'))
+            .reset_index())
+
+def network_hourly_profile(zone_hourly: pd.DataFrame) -> pd.DataFrame:
+    """Network-wide (hour of day) profile from the per-zone one, weighting each zone by its station-hours."""
+    weights = zone_hourly['station_hours']
+    occupancy_weights = weights.where(zone_hourly['mean_occupancy'].notna(), 0)
+    by_hour = (zone_hourly.assign(volume=zone_hourly['mean_volume'] * weights,
+                                  occupancy=zone_hourly['mean_occupancy'].fillna(0) * occupancy_weights,
+                                  occupancy_hours=occupancy_weights)
+               .groupby('hour', sort=True)[['volume', 'occupancy', 'station_hours', 'occupancy_hours']].sum())
+    return pd.DataFrame({
+        'hour': by_hour.index,
+        'mean_volume': by_hour['volume'] / by_hour['station_hours'],
+        'mean_occupancy': by_hour['occupancy'] / by_hour['occupancy_hours'].where(by_hour['occupancy_hours'] > 0),
+        'station_hours': by_hour['station_hours'],
+    }).reset_index(drop=True)
+
+def _peak_load(forecast: pd.DataFrame, by: Optional[str] = None) -> pd.DataFrame:
+    """Highest predicted network (or per-`by`) volume summed over stations in any one forecast hour."""
+    keys = [by, 'time'] if by else ['time']
+    load = forecast.groupby(keys, sort=False)['predicted_volume'].sum().reset_index()
+    peaks = load.loc[load.groupby(by, sort=True)['predicted_volume'].idxmax()] if by else load.nlargest(1, 'predicted_volume')
+    return peaks.rename(columns={'predicted_volume': 'peak_predicted_volume', 'time': 'peak_time'}).reset_index(drop=True)
+
+def build_rollups(stations: pd.DataFrame, hourly: Optional[pd.DataFrame] = None,
+                  forecast: Optional[pd.DataFrame] = None, top_n: int = TOP_N_STATIONS) -> Dict[str, pd.DataFrame]:
+    """
+    Precomputes every aggregate the dashboard, LLM context builders and APIs read:
+      network      - one row: station/pile totals and charge_count distribution, plus historical
+                     volume/occupancy and predicted peak load when those sources are given
+      zones        - one row per TAZID with the same measures
+      top_stations - the top_n stations by charge_count
+      zone_hourly  - historical (TAZID, hour of day) profile, only when `hourly` is given
+    `hourly` is the preprocessed station-hour table; `forecast` is app.forecast's grid.
+    """
+    piles = stations['charge_count']
+    network = pd.DataFrame([{
+        'total_stations': len(stations),
+        'total_piles': int(piles.sum()),
+        'mean_piles': float(piles.mean()),
+        'median_piles': float(piles.median()),
+        'min_piles': int(piles.min()),
+        'max_piles': int(piles.max()),
+        'std_piles': float(piles.std()),
+        'zones': int(stations['TAZID'].nunique()),
+    }])
+    zones = (stations.groupby('TAZID', sort=True)
+             .agg(stations=('station_id', 'size'), total_piles=('charge_count', 'sum'),
+                  mean_piles=('charge_count', 'mean'), max_piles=('charge_count', 'max'))
+             .reset_index())
+    top_stations = (stations.sort_values('charge_count', ascending=False, kind='stable')
+                    .head(top_n)[['station_id', 'charge_count', 'TAZID']].reset_index(drop=True))
+    tables = {'network': network, 'zones': zones, 'top_stations': top_stations}
+
+    if hourly is not None and not hourly.empty:
+        history = _with_zones(hourly[['station_id', 'volume']].assign(occupancy=_occupancy(hourly)), stations)
+        per_zone = (history.groupby('TAZID', sort=True)
+                    .agg(hist_mean_volume=('volume', 'mean'), hist_mean_occupancy=('occupancy', 'mean'))
+                    .reset_index())
+        tables['zones'] = zones.merge(per_zone, on='TAZID', how='left')
+        network['hist_mean_volume'] = float(history['volume'].mean())
+        network['hist_mean_occupancy'] = float(history['occupancy'].mean())
+        network['hist_stations'] = int(history['station_id'].nunique())
+        tables['zone_hourly'] = zone_hourly_history(hourly, stations)
+
+    if forecast is not None and not forecast.empty:
+        tables = apply_forecast(tables, forecast)
+    return tables
+
+def network_row(tables: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """The single network row as a plain dict, keeping each column's own type (ints stay ints)."""
+    return tables['network'].to_dict('records')[0]
+
+def apply_forecast(tables: Dict[str, pd.DataFrame], forecast: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Replaces the predicted peak-load columns of network and zones with those of a new forecast grid."""
+    zones = tables['zones'].drop(columns=PEAK_COLUMNS, errors='ignore')
+    network = tables['network'].drop(columns=PEAK_COLUMNS, errors='ignore')
+    peak = _peak_load(forecast).iloc[0]
+    network['peak_predicted_volume'] = float(peak['peak_predicted_volume'])
+    network['peak_time'] = peak['peak_time']
+    return {**tables, 'network': network, 'zones': zones.merge(_peak_load(forecast, 'TAZID'), on='TAZID', how='left')}
+
+def refresh_forecast_rollups(forecast: pd.DataFrame, directory: str = DEFAULT_ROLLUP_DIR,
+                             forecast_path: Optional[str] = None) -> None:
+    """
+    Folds a fresh forecast into the materialized tables without recomputing history. With no
+    rollups on disk yet, pile aggregates are rebuilt from the station attributes the grid carries.
+    """
+    tables = load_rollups(directory)
+    sources = read_manifest(directory).get("sources", {}) if tables is not None else {}
+    if tables is None:
+        stations = forecast.drop_duplicates('station_id')[['station_id', 'charge_count', 'TAZID']]
+        tables = build_rollups(stations)
+    if forecast_path:
+        sources["forecast"] = forecast_path
+    write_rollups(apply_forecast(tables, forecast), directory, sources)
+
+def carry_forecast_peaks(tables: Dict[str, pd.DataFrame], previous: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Copies the predicted peak-load columns of previously materialized tables onto freshly built ones."""
+    if not set(PEAK_COLUMNS) <= set(previous['network'].columns):
+        return tables
+    network = tables['network'].drop(columns=PEAK_COLUMNS, errors='ignore')
+    for col in PEAK_COLUMNS:
+        network[col] = previous['network'][col].iloc[0]
+    zones = tables['zones'].drop(columns=PEAK_COLUMNS, errors='ignore')
+    if set(PEAK_COLUMNS) <= set(previous['zones'].columns):
+        zones = zones.merge(previous['zones'][['TAZID'] + PEAK_COLUMNS], on='TAZID', how='left')
+    return {**tables, 'network': network, 'zones': zones}
+
+def carry_occupancy(tables: Dict[str, pd.DataFrame], previous: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Copies the occupancy measures of previously materialized tables onto freshly built ones.
+    Used when the new history has no busy/idle counts, so measured values are never replaced by NaN.
+    """
+    carried = dict(tables)
+    for name, (keys, col) in OCCUPANCY_COLUMNS.items():
+        if name not in tables or name not in previous or col not in previous[name].columns:
+            continue
+        table = tables[name].copy()
+        if keys:
+            values = previous[name].set_index(keys)[col]
+            table[col] = values.reindex(pd.MultiIndex.from_frame(table[keys])).to_numpy()
+        else:
+            table[col] = previous[name][col].iloc[0]
+        carried[name] = table
+    return carried
+
+def refresh_history_rollups(stations: pd.DataFrame, hourly: pd.DataFrame, directory: str = DEFAULT_ROLLUP_DIR,
+                            sources: Optional[Dict[str, str]] = None) -> None:
+    """
+    Rebuilds the pile and history tables after a training run. The predicted peaks (and their
+    forecast source) are carried over from the materialized tables until the next forecast run.
+    History without busy/idle counts (e.g. from a stored training set) keeps the previous occupancy.
+    """
+    tables = build_rollups(stations, hourly)
+    previous = load_rollups(directory)
+    sources = dict(sources or {})
+    if previous is not None:
+        if not {'busy', 'idle'} <= set(hourly.columns):
+            tables = carry_occupancy(tables, previous)
+        tables = carry_forecast_peaks(tables, previous)
+        forecast_source = read_manifest(directory).get("sources", {}).get("forecast")
+        if forecast_source and 'peak_predicted_volume' in tables['network']:
+            sources["forecast"] = forecast_source
+    write_rollups(tables, directory, sources)
+
+def write_rollups(tables: Dict[str, pd.DataFrame], directory: str = DEFAULT_ROLLUP_DIR,
+                  sources: Optional[Dict[str, str]] = None) -> None:
+    """
+    Materializes each table as a per-column .npz plus a manifest, built beside the target and
+    swapped in so readers never see a mix of old and new tables.
+    """
+    with staged_directory(directory) as staging_dir:
+        for name, table in tables.items():
+            save_frame_npz(table, staging_dir / f"{name}.npz")
+
+        manifest = {
+            "version": ROLLUP_VERSION,
+            "built_at": pd.Timestamp.now().isoformat(),
+            "tables": {name: len(table) for name, table in tables.items()},
+            "sources": sources or {},
+        }
+        with open(staging_dir / ROLLUP_MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+    logger.info(f"Materialized {len(tables)} rollup tables to {directory}")
+
+def read_manifest(directory: str = DEFAULT_ROLLUP_DIR) -> Dict[str, Any]:
+    manifest_path = Path(directory) / ROLLUP_MANIFEST
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def load_rollups(directory: str = DEFAULT_ROLLUP_DIR) -> Optional[Dict[str, pd.DataFrame]]:
+    """Reads every materialized table, or returns None if no (readable) rollups exist yet."""
+    try:
+        manifest = read_manifest(directory)
+        if not manifest:
+            return None
+        tables = {}
+        for name in manifest["tables"]:
+            tables[name] = load_frame_npz(Path(directory) / f"{name}.npz")
+        return tables
+    except Exception as e:
+        logger.error(f"Unreadable rollups at {directory}. Exception: {e}")
+        return None
+
+def training_set_history(training_set: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Station-hour volume recovered from a stored training set (it carries no busy/idle counts)."""
+    return pd.DataFrame({'station_id': training_set['station_id'], 'time': training_set['time'],
+                         'volume': training_set['y']})
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the materialized zone and network rollup tables.")
+    parser.add_argument("--station-info", default=DEFAULT_STATION_INFO_PATH)
+    parser.add_argument("--training-set", default="models/training_set.npz",
+                        help="Stored training set for historical volume (skipped if absent).")
+    parser.add_argument("--forecast", default="models/forecast_week.npz",
+                        help="app.forecast output for predicted peak load (skipped if absent).")
+    parser.add_argument("--output", default=DEFAULT_ROLLUP_DIR)
+    args = parser.parse_args(argv)
+
+    stations = pd.read_csv(args.station_info)
+    training_set = load_training_set(args.training_set)
+    hourly = training_set_history(training_set) if training_set is not None else None
+    forecast = load_forecast(args.forecast) if os.path.exists(args.forecast) else None
+
+    tables = build_rollups(stations, hourly, forecast)
+    sources = {"station_info": args.station_info}
+    if hourly is not None:
+        sources["history"] = args.training_set
+    if forecast is not None:
+        sources["forecast"] = args.forecast
+    write_rollups(tables, args.output, sources)
+    print(tables['network'].T.to_string(header=False))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
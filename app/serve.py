@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import logging
+import threading
+import warnings
+import numpy as np
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from app.features import FeatureTransform, transform_from_artifact
+from app.model import FlatForest, load_artifact
+from app.shards import ShardRegistry, DEFAULT_MEMORY_BUDGET
+from app.profiling import add_profiling_args, prometheus_text, session_from_args, stage
+
+logger = logging.getLogger(__name__)
+
+class ServeMetrics:
+    """Thread-safe latency/throughput counters exposed on GET /metrics."""
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._latencies = deque(maxlen=window)  # recent request latencies for percentiles
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+
+    def record_request(self, rows: int, latency_s: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self._latencies.append(latency_s)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def record_batch(self, rows: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.batched_rows += rows
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+            return {
+                "uptime_s": uptime,
+                "requests_total": self.requests,
+                "rows_total": self.rows,
+                "errors_total": self.errors,
+                "batches_total": self.batches,
+                "mean_batch_rows": self.batched_rows / self.batches if self.batches else 0.0,
+                "requests_per_s": self.requests / uptime if uptime else 0.0,
+                "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+            }
+
+class _Pending:
+    __slots__ = ("X", "done", "result", "error")
+
+    def __init__(self, X: np.ndarray):
+        self.X = X
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into a single predict call.
+    The first queued request opens a window of max_wait_ms; everything that arrives in
+    that window (up to max_batch rows) is stacked and scored together, amortizing the
+    per-call model overhead across all of them.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], metrics: ServeMetrics,
+                 max_batch: int = 1024, max_wait_ms: float = 2.0):
+        self._predict_fn = predict_fn
+        self._metrics = metrics
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        pending = _Pending(X)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get()]
+        rows = len(batch[0].X)
+        deadline = time.monotonic() + self._max_wait
+        while rows < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item.X)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                X = np.vstack([item.X for item in batch]) if len(batch) > 1 else batch[0].X
+                with stage("serve.predict_batch", rows=len(X)):
+                    predictions = self._predict_fn(X)
+                self._metrics.record_batch(len(X))
+                offset = 0
+                for item in batch:
+                    item.result = predictions[offset:offset + len(item.X)]
+                    offset += len(item.X)
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+def sklearn_predict_fn(model: Any) -> Callable[[np.ndarray], np.ndarray]:
+    """Wraps model.predict for raw arrays, muting the per-call feature-name warning of DataFrame-fitted models."""
+    def predict(X: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return model.predict(X)
+    return predict
+
+def compiled_predict_fn(model: Any) -> Callable[[np.ndarray], np.ndarray]:
+    """Prefers the flat-array forest engine, falling back to sklearn for non-forest artifacts."""
+    if isinstance(model, FlatForest):
+        return model.predict
+    if hasattr(model, "estimators_"):
+        return FlatForest.from_sklearn(model).predict
+    return sklearn_predict_fn(model)
+
+def route_zones(registry: ShardRegistry, instances: List[Dict[str, Any]]) -> np.ndarray:
+    """Resolves each instance's shard from an explicit 'zone' or its 'station_id'."""
+    zones = np.empty(len(instances), dtype=np.float32)
+    for i, inst in enumerate(instances):
+        zone = inst.get("zone")
+        if zone is None and "station_id" in inst:
+            zone = registry.zone_for_station(inst["station_id"])
+        if zone is None:
+            raise ValueError(f"Instance {i} needs a 'zone' or a known 'station_id' for sharded serving")
+        if not registry.can_serve(zone):
+            raise ValueError(f"No model available for zone {zone}")
+        zones[i] = zone
+    return zones
+
+def sharded_predict_fn(registry: ShardRegistry) -> Callable[[np.ndarray], np.ndarray]:
+    """The zone id rides along as a trailing column so one micro-batch can span many shards."""
+    def predict(X: np.ndarray) -> np.ndarray:
+        return registry.predict(X[:, -1], X[:, :-1])
+    return predict
+
+def make_handler(batcher: MicroBatcher, metrics: ServeMetrics, transform: FeatureTransform,
+                 registry: Optional[ShardRegistry] = None):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so load generators don't pay a TCP handshake per request
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/metrics":
+                snapshot = metrics.snapshot()
+                if registry is not None:
+                    snapshot["shards"] = registry.stats()
+                self._send_json(200, snapshot)
+            elif self.path == "/metrics/stages":
+                body = prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                instances = payload["instances"] if "instances" in payload else [payload]
+                X = transform.transform_records(instances)
+                if registry is not None:
+                    X = np.column_stack([X, route_zones(registry, instances)])
+            except (ValueError, KeyError, TypeError) as e:
+                metrics.record_error()
+                self._send_json(400, {"error": f"Malformed request: {e}"})
+                return
+
+            try:
+                predictions = batcher.predict(X)
+            except Exception as e:
+                metrics.record_error()
+                logger.error(f"Prediction failed for batch of {len(X)} rows. Exception: {e}")
+                self._send_json(500, {"error": "Prediction failed"})
+                return
+
+            metrics.record_request(len(X), time.perf_counter() - start)
+            self._send_json(200, {"predictions": predictions.tolist()})
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate CPU at hundreds of requests per second
+            pass
+
+    return PredictionHandler
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops connections as soon as a burst of clients arrives
+    request_queue_size = 256
+
+def build_server(model: Any, host: str = "127.0.0.1", port: int = 8080,
+                 max_batch: int = 1024, max_wait_ms: float = 2.0, compiled: bool = True,
+                 transform: Optional[FeatureTransform] = None,
+                 registry: Optional[ShardRegistry] = None) -> PredictionServer:
+    """
+    Wires model, batcher and handler together. With a registry, requests are routed to per-zone
+    shards and model (if any) only answers zones that have no shard of their own.
+    """
+    metrics = ServeMetrics()
+    if registry is not None:
+        if model is not None and registry.fallback_model is None:
+            registry.fallback_model = FlatForest.from_sklearn(model) if compiled and hasattr(model, "estimators_") else model
+        predict_fn = sharded_predict_fn(registry)
+        transform = transform or registry.transform
+    else:
+        predict_fn = compiled_predict_fn(model) if compiled else sklearn_predict_fn(model)
+    batcher = MicroBatcher(predict_fn, metrics, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    return PredictionServer((host, port), make_handler(batcher, metrics, transform or FeatureTransform(), registry))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve micro-batched EV demand forecasts over HTTP.")
+    parser.add_argument("--model", default="models/rf_demand.pkl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=1024, help="Upper bound on rows per predict call.")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Batching window opened by the first queued request.")
+    parser.add_argument("--no-compile", action="store_true", help="Score with sklearn's predict instead of the flat-array engine.")
+    parser.add_argument("--shards", default=None,
+                        help="Shard registry directory; requests then carry 'zone' or 'station_id' and hit per-zone models.")
+    parser.add_argument("--shard-memory-mb", type=float, default=DEFAULT_MEMORY_BUDGET / 1024 ** 2,
+                        help="Budget for warm shards before least-recently-used ones are evicted.")
+    add_profiling_args(parser)
+    args = parser.parse_args(argv)
+    with session_from_args(args):
+        run(args)
+
+def run(args: argparse.Namespace) -> None:
+
+    # Load the artifact exactly once per process; every request reuses the warm model.
+    # In sharded mode the global artifact is optional and only backs zones without a shard.
+    artifact = load_artifact(args.model) if (args.shards is None or os.path.exists(args.model)) else None
+    if artifact is None and args.shards is None:
+        logger.critical(f"No usable model artifact at {args.model}. Run train_model.py first.")
+        sys.exit(1)
+
+    registry = ShardRegistry(args.shards, memory_budget=int(args.shard_memory_mb * 1024 ** 2)) if args.shards else None
+
+    # The artifact's own feature spec decides column order, never a hard-coded server-side list
+    server = build_server(artifact["model"] if artifact else None, args.host, args.port, args.max_batch, args.max_wait_ms,
+                          compiled=not args.no_compile, transform=transform_from_artifact(artifact) if artifact else None,
+                          registry=registry)
+    logger.info(f"Serving forecasts on http://{args.host}:{args.port} (max_batch={args.max_batch}, window={args.max_wait_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+    main(sys.argv[1:])
@@ -0,0 +1,158 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Optional
+
+from app.model import build_forest, evaluate_model, save_model, load_model
+from app.features import FeatureTransform
+from app.preprocess import DEFAULT_STATION_INFO_PATH
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE = "registry.json"
+DEFAULT_MEMORY_BUDGET = 512 * 1024 ** 2
+
+def load_station_zones(path: str = DEFAULT_STATION_INFO_PATH) -> Dict[int, int]:
+    """Maps every station_id to its TAZID traffic zone from station_information.csv."""
+    info = pd.read_csv(path, usecols=['station_id', 'TAZID'])
+    return dict(zip(info['station_id'].astype(int), info['TAZID'].astype(int)))
+
+def _fit_shard(zone: int, X: np.ndarray, y: np.ndarray, shard_path: str, feature_spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: fits and exports one zone's forest. Shards train in parallel, so each stays single-threaded."""
+    # Hold out every fifth hour in time order, keeping the split deterministic per zone
+    holdout = np.arange(len(y)) % 5 == 4
+    model = build_forest(n_jobs=1)
+    model.fit(X[~holdout], y[~holdout])
+    metrics = evaluate_model(model, X[holdout], y[holdout])
+    save_model(model, metrics, shard_path, artifact_format="flat", feature_spec=feature_spec)
+    nbytes = sum(f.stat().st_size for f in Path(shard_path).glob("*.npy"))
+    return {"zone": zone, "path": os.path.basename(shard_path), "rows": int(len(y)), "nbytes": nbytes,
+            "metrics": {k: float(v) for k, v in metrics.items()}}
+
+def train_zone_shards(full_df: pd.DataFrame, station_zones: Dict[int, int], registry_dir: str,
+                      transform: FeatureTransform, target: str = 'volume', min_rows: int = 500,
+                      max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Trains one forest per TAZID zone in a process pool and writes a registry describing them.
+    Zones with fewer than min_rows hourly rows get no shard and are served by the global model.
+    Shards are written in the flat, memory-mappable format so lazy loading is cheap.
+    """
+    if 'station_id' not in full_df.columns:
+        raise ValueError("Sharded training needs a station_id column on the master table.")
+
+    zones = full_df['station_id'].map(station_zones)
+    unmapped = zones.isna()
+    if unmapped.any():
+        logger.warning(f"{full_df.loc[unmapped, 'station_id'].nunique()} stations have no TAZID and are excluded from shards")
+
+    registry_path = Path(registry_dir)
+    registry_path.mkdir(parents=True, exist_ok=True)
+    spec = transform.to_spec()
+    shards: Dict[str, Dict[str, Any]] = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = []
+        for zone, zone_df in full_df[~unmapped].groupby(zones[~unmapped].astype(int)):
+            if len(zone_df) < min_rows:
+                logger.info(f"Zone {zone} has only {len(zone_df)} rows; deferring to the global model")
+                continue
+            zone_df = zone_df.sort_values('time', kind='stable')
+            X, y = transform.transform(zone_df), zone_df[target].to_numpy()
+            futures.append(pool.submit(_fit_shard, int(zone), X, y, str(registry_path / f"zone_{zone}"), spec))
+
+        for future in as_completed(futures):
+            entry = future.result()
+            entry["stations"] = sorted(int(s) for s, z in station_zones.items() if z == entry["zone"])
+            shards[str(entry["zone"])] = entry
+            logger.info(f"Zone {entry['zone']} shard trained on {entry['rows']} rows (MAE {entry['metrics']['MAE']:.3f})")
+
+    registry = {
+        "features": spec,
+        "station_zones": {str(s): int(z) for s, z in station_zones.items()},
+        "shards": dict(sorted(shards.items(), key=lambda item: int(item[0]))),
+    }
+    with open(registry_path / REGISTRY_FILE, "w") as f:
+        json.dump(registry, f, indent=2)
+    logger.info(f"Shard registry with {len(shards)} zone models written to {registry_path}")
+    return registry
+
+class ShardRegistry:
+    """
+    Serving-side view of a shard directory. A zone's model is loaded on its first request and
+    kept in an LRU of warm shards; once resident shards exceed memory_budget bytes, the least
+    recently used ones are dropped, so one process can front the whole network.
+    """
+
+    def __init__(self, registry_dir: str, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 fallback_model: Optional[Any] = None):
+        self.registry_dir = Path(registry_dir)
+        with open(self.registry_dir / REGISTRY_FILE) as f:
+            manifest = json.load(f)
+        self.transform = FeatureTransform.from_spec(manifest.get("features"))
+        self.station_zones = {int(s): int(z) for s, z in manifest["station_zones"].items()}
+        self.shards = {int(z): entry for z, entry in manifest["shards"].items()}
+        self.memory_budget = memory_budget
+        self.fallback_model = fallback_model
+
+        self._lock = threading.Lock()
+        self._warm: "OrderedDict[int, Any]" = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def zone_for_station(self, station_id: int) -> Optional[int]:
+        return self.station_zones.get(int(station_id))
+
+    def can_serve(self, zone: int) -> bool:
+        return int(zone) in self.shards or self.fallback_model is not None
+
+    def get(self, zone: int) -> Any:
+        """Returns the zone's model, loading it (and evicting cold shards) on a miss."""
+        zone = int(zone)
+        entry = self.shards.get(zone)
+        if entry is None:
+            if self.fallback_model is None:
+                raise KeyError(f"No shard for zone {zone} and no fallback model configured.")
+            return self.fallback_model
+
+        with self._lock:
+            if zone in self._warm:
+                self._warm.move_to_end(zone)
+                self.hits += 1
+                return self._warm[zone]
+
+            self.misses += 1
+            model = load_model(str(self.registry_dir / entry["path"]))
+            if model is None:
+                raise RuntimeError(f"Shard artifact for zone {zone} is missing or corrupted.")
+            self._warm[zone] = model
+            self.resident_bytes += entry["nbytes"]
+
+            # Never evict the shard that was just requested, even if it alone exceeds the budget
+            while self.resident_bytes > self.memory_budget and len(self._warm) > 1:
+                cold_zone, _ = self._warm.popitem(last=False)
+                self.resident_bytes -= self.shards[cold_zone]["nbytes"]
+                self.evictions += 1
+            return model
+
+    def predict(self, zones: np.ndarray, X: np.ndarray) -> np.ndarray:
+        """Scores each row with its zone's shard, one batched predict call per distinct zone."""
+        zones = np.asarray(zones, dtype=np.int64)
+        out = np.empty(len(X), dtype=np.float64)
+        for zone in np.unique(zones):
+            rows = zones == zone
+            out[rows] = self.get(int(zone)).predict(X[rows])
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"shards_total": len(self.shards), "shards_warm": len(self._warm),
+                    "resident_bytes": self.resident_bytes, "memory_budget": self.memory_budget,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
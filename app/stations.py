@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from sklearn.neighbors import BallTree
+
+from app.preprocess import DEFAULT_STATION_INFO_PATH
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius; BallTree's haversine metric works in radians on the unit sphere
+EARTH_RADIUS_KM = 6371.0088
+
+ArrayLike = Union[float, np.ndarray, List[float]]
+
+def _to_radians(lat: ArrayLike, lon: ArrayLike) -> np.ndarray:
+    """Stacks query points as the (n, 2) [lat, lon] radian array BallTree expects."""
+    lat, lon = np.broadcast_arrays(np.atleast_1d(np.asarray(lat, dtype=np.float64)),
+                                   np.atleast_1d(np.asarray(lon, dtype=np.float64)))
+    if ((lat < -90) | (lat > 90)).any() or ((lon < -180) | (lon > 180)).any():
+        raise ValueError("latitude must be within -90..90 and longitude within -180..180")
+    return np.radians(np.column_stack([lat, lon]))
+
+class StationCatalog:
+    """
+    Immutable, spatially indexed view of station_information.csv.
+    A haversine BallTree over every station is built once at load time. Queries with a
+    min_piles filter use a tree over just the qualifying stations. That tree is built on first
+    use per threshold and reused, so the filter never post-filters a k-NN result that might
+    come up short. All queries take arrays of points and answer them in one batched call.
+    """
+
+    def __init__(self, stations: pd.DataFrame):
+        missing = [c for c in ('station_id', 'latitude', 'longitude', 'charge_count') if c not in stations.columns]
+        if missing:
+            raise ValueError(f"Station table missing required columns: {missing}")
+        self.stations = stations.reset_index(drop=True)
+        self.station_ids = self.stations['station_id'].to_numpy(dtype=np.int64)
+        self.charge_counts = self.stations['charge_count'].to_numpy(dtype=np.int64)
+        self._coords = np.radians(self.stations[['latitude', 'longitude']].to_numpy(dtype=np.float64))
+        # Keyed by min_piles: (tree over qualifying stations, their row positions in self.stations)
+        self._trees: Dict[int, Tuple["BallTree", np.ndarray]] = {}
+        self._tree_for(0)
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_STATION_INFO_PATH) -> "StationCatalog":
+        catalog = cls(pd.read_csv(path))
+        logger.info(f"Indexed {len(catalog)} stations from {path}")
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.station_ids)
+
+    def _tree_for(self, min_piles: int) -> Tuple["BallTree", np.ndarray]:
+        # Imported on first index build, so importing this module stays cheap (see bench_cold_start)
+        from sklearn.neighbors import BallTree
+        min_piles = max(int(min_piles), 0)
+        if min_piles not in self._trees:
+            rows = np.flatnonzero(self.charge_counts >= min_piles)
+            if len(rows) == 0:
+                raise ValueError(f"No station has at least {min_piles} charging piles.")
+            self._trees[min_piles] = (BallTree(self._coords[rows], metric='haversine'), rows)
+        return self._trees[min_piles]
+
+    def nearest(self, lat: ArrayLike, lon: ArrayLike, k: int = 1, min_piles: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest stations with at least min_piles piles for each query point.
+        Returns (station_ids, distances_km), both of shape (n_points, k) and sorted by distance.
+        If fewer than k stations qualify, k is reduced to the number that do.
+        """
+        tree, rows = self._tree_for(min_piles)
+        dist, idx = tree.query(_to_radians(lat, lon), k=min(k, len(rows)))
+        return self.station_ids[rows[idx]], dist * EARTH_RADIUS_KM
+
+    def within_radius(self, lat: ArrayLike, lon: ArrayLike, radius_km: float,
+                      min_piles: int = 0) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Every station within radius_km of each query point, nearest first.
+        Returns per-point lists of station_id arrays and matching distance arrays in km.
+        """
+        tree, rows = self._tree_for(min_piles)
+        idx, dist = tree.query_radius(_to_radians(lat, lon), r=radius_km / EARTH_RADIUS_KM,
+                                      return_distance=True, sort_results=True)
+        return [self.station_ids[rows[i]] for i in idx], [d * EARTH_RADIUS_KM for d in dist]
+
+    def count_within_radius(self, lat: ArrayLike, lon: ArrayLike, radius_km: float, min_piles: int = 0) -> np.ndarray:
+        """Number of qualifying stations within radius_km of each point, without materializing them."""
+        tree, _ = self._tree_for(min_piles)
+        return tree.query_radius(_to_radians(lat, lon), r=radius_km / EARTH_RADIUS_KM, count_only=True)
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks and the synthetic UrbanEV-shaped data they run on.
+
+Every module is a script; run them from the repository root with `python -m benchmarks.<name>`.
+benchmarks.suite times each pipeline stage against a stored baseline; the bench_* scripts
+compare specific implementations head to head.
+"""
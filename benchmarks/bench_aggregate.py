@@ -0,0 +1,51 @@
+"""
+Per-station resample vs. vectorized network-wide hourly aggregation.
+
+Run from the repository root:
+    python -m benchmarks.bench_aggregate --stations 10 100 1000 --days 7
+"""
+import time
+import argparse
+import pandas as pd
+from typing import List, Optional
+
+from app.preprocess import aggregate_to_hourly, aggregate_network_hourly
+from benchmarks.synthetic import network_telemetry
+
+def synthetic_network(n_stations: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """Long 5-minute telemetry frame shaped like load_charging_data output, duplicates already dropped."""
+    return network_telemetry(n_stations, days, seed=seed).drop_duplicates().reset_index(drop=True)
+
+def per_station(df: pd.DataFrame) -> pd.DataFrame:
+    frames = []
+    for station_id, group in df.groupby("station_id", sort=True):
+        hourly = aggregate_to_hourly(group.drop(columns="station_id"))
+        hourly.insert(0, "station_id", station_id)
+        frames.append(hourly)
+    return pd.concat(frames, ignore_index=True)
+
+def run(station_counts: List[int], days: int) -> None:
+    print(f"{'stations':>8} {'rows':>10} {'per-station s':>14} {'network s':>10} {'speedup':>8}")
+    for n_stations in station_counts:
+        df = synthetic_network(n_stations, days)
+
+        start = time.perf_counter()
+        expected = per_station(df)
+        per_station_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = aggregate_network_hourly(df)
+        network_s = time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+        print(f"{n_stations:>8} {len(df):>10} {per_station_s:>14.3f} {network_s:>10.3f} {per_station_s / network_s:>7.1f}x")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args(argv)
+    run(args.stations, args.days)
+
+if __name__ == "__main__":
+    main()
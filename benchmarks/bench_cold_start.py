@@ -0,0 +1,137 @@
+"""
+Cold-start import cost and time-to-first-render for the Streamlit app and the training CLI.
+
+Each entry point is started in a fresh interpreter under `python -X importtime`. The report lists
+the top-level modules that cost the most, flags heavy dependencies that should only load on the
+page or stage that needs them, and compares the best wall time against a budget.
+
+For app.py, "first render" means importing its top-level modules plus loading the rollup tables
+the Dashboard paints from. The model and the full station table load on a background thread and
+are left out. Modules that are not installed here (e.g. streamlit) are skipped and reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --budget-s 0.8 --repeats 5 --fail-over-budget
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+from app.rollups import DEFAULT_ROLLUP_DIR
+
+APP_PATH = "app.py"
+DEFAULT_BUDGET_S = 1.0
+# Must stay off the first-render/CLI-startup path: each costs hundreds of ms and only one page or stage uses it
+HEAVY_MODULES = ("sklearn", "scipy", "plotly", "huggingface_hub", "groq")
+
+# Run in the child interpreter: times the entry point's startup work and reports which heavy modules it pulled in
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def top_level_imports(path: str) -> List[str]:
+    """Modules a script imports at module level (function-local imports are excluded)."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+def app_first_render_body(rollup_dir: str) -> Tuple[str, List[str]]:
+    """Probe body for app.py's startup path, and the top-level modules skipped as not installed."""
+    modules = top_level_imports(APP_PATH)
+    skipped = [m for m in modules if not installed(m)]
+    lines = [f"import {m}" for m in modules if m not in skipped]
+    lines += ["from app.rollups import load_rollups",
+              f"load_rollups({rollup_dir!r})"]
+    return "\n".join(lines), skipped
+
+def cli_startup_body() -> str:
+    """Probe body for train_model's startup path: imports and argument parsing, no stage run."""
+    return "import train_model\ntrain_model.parse_args([])"
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for each 'import time:' line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def probe(body: str) -> Tuple[float, List[str], List[Tuple[str, int, int, int]]]:
+    """Runs body in a fresh interpreter. Returns (seconds, heavy modules loaded, importtime rows)."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(body=body, heavy=HEAVY_MODULES)],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Cold-start probe failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result["seconds"], result["loaded"], parse_importtime(proc.stderr)
+
+def measure(name: str, body: str, repeats: int, top: int) -> Dict[str, object]:
+    """Best-of-repeats startup time; the import breakdown comes from the fastest run."""
+    runs = [probe(body) for _ in range(repeats)]
+    seconds, loaded, rows = min(runs, key=lambda run: run[0])
+    print(f"\n{name}: {seconds * 1e3:.0f} ms (best of {repeats})")
+    print(f"  {'top-level module':<40} {'cumulative ms':>14} {'self ms':>9}")
+    for module, self_us, cumulative_us, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:top]:
+        print(f"  {module:<40} {cumulative_us / 1e3:>14.1f} {self_us / 1e3:>9.1f}")
+    if loaded:
+        print(f"  heavy modules on the startup path: {', '.join(loaded)}")
+    return {"seconds": seconds, "heavy_loaded": loaded}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-s", type=float, default=DEFAULT_BUDGET_S,
+                        help="Time-to-first-render budget for app.py, in seconds.")
+    parser.add_argument("--cli-budget-s", type=float, default=DEFAULT_BUDGET_S,
+                        help="Startup budget for the training CLI, in seconds.")
+    parser.add_argument("--rollup-dir", default=DEFAULT_ROLLUP_DIR)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="Top-level modules to list per entry point.")
+    parser.add_argument("--fail-over-budget", action="store_true",
+                        help="Exit non-zero if a budget is exceeded or a heavy module loads at startup.")
+    args = parser.parse_args(argv)
+
+    body, skipped = app_first_render_body(args.rollup_dir)
+    if skipped:
+        print(f"Not installed, left out of the app.py measurement: {', '.join(skipped)}")
+    results = {
+        "app.py first render": (measure("app.py first render", body, args.repeats, args.top), args.budget_s),
+        "train_model startup": (measure("train_model startup", cli_startup_body(), args.repeats, args.top), args.cli_budget_s),
+    }
+
+    failures = []
+    print(f"\n{'entry point':<22} {'ms':>8} {'budget ms':>10}")
+    for name, (result, budget) in results.items():
+        over = result["seconds"] > budget or result["heavy_loaded"]
+        print(f"{name:<22} {result['seconds'] * 1e3:>8.0f} {budget * 1e3:>10.0f}{'  OVER BUDGET' if over else ''}")
+        if over:
+            failures.append(name)
+    if failures and args.fail_over_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-row serving latency: the legacy per-request DataFrame route vs. FeatureTransform + predict.
+
+Run from the repository root:
+    python -m benchmarks.bench_features
+    python -m benchmarks.bench_features --model models/rf_demand.pkl
+"""
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Optional
+
+from app.features import FeatureTransform
+from app.model import FlatForest, load_artifact
+from benchmarks.bench_flat_forest import synthetic_forest
+
+def _per_row_us(fn: Callable[[], None], repeats: int) -> float:
+    fn()  # warm caches and lazy imports
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+def run(model, transform: FeatureTransform, repeats: int) -> None:
+    request = {"hour": 18, "day_of_week": 4, "s_price": 0.55, "e_price": 1.05}
+    flat = FlatForest.from_sklearn(model) if hasattr(model, "estimators_") else model
+    buffer = np.empty((1, len(transform.features)), dtype=np.float32)
+
+    def dataframe_route():
+        # What the dashboard did per interaction: build a frame, derive features, predict
+        hour = request["hour"]
+        df = pd.DataFrame([{
+            "hour_sin": np.sin(2 * np.pi * hour / 24), "hour_cos": np.cos(2 * np.pi * hour / 24),
+            "day_of_week": request["day_of_week"], "is_weekend": int(request["day_of_week"] >= 5),
+            "s_price": request["s_price"], "e_price": request["e_price"],
+        }])[transform.features]
+        model.predict(df)
+
+    def transform_route():
+        model.predict(transform.transform(request, out=buffer))
+
+    def transform_flat_route():
+        flat.predict(transform.transform(request, out=buffer))
+
+    def transform_only():
+        transform.transform(request, out=buffer)
+
+    with warnings.catch_warnings():
+        # Feature-name mismatch warnings are expected here, whichever way the model was fitted
+        warnings.simplefilter("ignore", UserWarning)
+        results = [
+            ("DataFrame + sklearn predict", _per_row_us(dataframe_route, repeats)),
+            ("FeatureTransform + sklearn predict", _per_row_us(transform_route, repeats)),
+            ("FeatureTransform + FlatForest", _per_row_us(transform_flat_route, repeats * 10)),
+            ("FeatureTransform alone", _per_row_us(transform_only, repeats * 100)),
+        ]
+
+    baseline = results[0][1]
+    for label, us in results:
+        print(f"{label:<36} {us:>10.1f} us/row  ({baseline / us:>6.1f}x)")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None, help="Artifact to benchmark instead of a synthetic forest.")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.model:
+        artifact = load_artifact(args.model)
+        if artifact is None:
+            raise SystemExit(f"Could not load {args.model}")
+        model, transform = artifact["model"], FeatureTransform.from_spec(artifact.get("features"))
+    else:
+        model, transform = synthetic_forest(), FeatureTransform()
+    run(model, transform, args.repeats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+sklearn RandomForestRegressor.predict vs. the FlatForest engine across batch sizes.
+
+Run from the repository root:
+    python -m benchmarks.bench_flat_forest                      # synthetic forest, production hyperparameters
+    python -m benchmarks.bench_flat_forest --model models/rf_demand.pkl
+"""
+import time
+import argparse
+import numpy as np
+from typing import Callable, List, Optional
+from sklearn.ensemble import RandomForestRegressor
+
+from app.features import FeatureTransform
+from app.model import FlatForest, build_forest, load_model
+from benchmarks.synthetic import network_hourly
+
+def synthetic_forest(n_stations: int = 30, days: int = 70, seed: int = 0) -> RandomForestRegressor:
+    """Fits the forest train_demand_model builds (app.model.build_forest) on ~50k synthetic hourly rows."""
+    hourly = network_hourly(n_stations, days, seed=seed)
+    X = FeatureTransform().transform(hourly)
+    return build_forest(n_jobs=-1).fit(X, hourly['volume'].to_numpy())
+
+def _best_of(fn: Callable[[], np.ndarray], budget_s: float = 1.0, max_repeats: int = 50) -> float:
+    timings = []
+    deadline = time.perf_counter() + budget_s
+    while len(timings) < max_repeats and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(model: RandomForestRegressor, batch_sizes: List[int]) -> None:
+    flat = FlatForest.from_sklearn(model)
+    rng = np.random.default_rng(1)
+    X_all = rng.random((max(batch_sizes), model.n_features_in_)).astype(np.float32)
+
+    print(f"{'batch':>8} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8} {'flat rows/s':>13}")
+    for n in batch_sizes:
+        X = X_all[:n]
+        np.testing.assert_allclose(flat.predict(X), model.predict(X), rtol=1e-9, atol=1e-9)
+        sk = _best_of(lambda: model.predict(X))
+        fl = _best_of(lambda: flat.predict(X))
+        print(f"{n:>8} {sk * 1e3:>11.3f} {fl * 1e3:>9.3f} {sk / fl:>7.1f}x {n / fl:>13,.0f}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None, help="Pickled artifact to benchmark instead of a synthetic forest.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model) if args.model else synthetic_forest()
+    if model is None:
+        raise SystemExit(f"Could not load {args.model}")
+    run(model, args.batch_sizes)
+
+if __name__ == "__main__":
+    main()
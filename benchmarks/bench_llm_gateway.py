@@ -0,0 +1,64 @@
+"""
+LLM gateway latency and cache behaviour, fully offline against the stub backend.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_gateway
+    python -m benchmarks.bench_llm_gateway --first-token-ms 800 --tokens-per-s 40 --ttl-s 1
+"""
+import time
+import argparse
+from typing import List, Optional
+
+from app.llm import LLMGateway, ResponseCache, StubBackend
+
+def _timed_stream(gateway: LLMGateway, backend: StubBackend, messages, context: str):
+    """Returns (seconds to first chunk, seconds to full reply, reply)."""
+    start = time.perf_counter()
+    first = None
+    parts = []
+    for chunk in gateway.stream_chat(backend, messages, context=context):
+        if first is None:
+            first = time.perf_counter() - start
+        parts.append(chunk)
+    return first, time.perf_counter() - start, "".join(parts)
+
+def run(first_token_ms: float, tokens_per_s: float, ttl_s: float, max_entries: int) -> None:
+    gateway = LLMGateway(ResponseCache(ttl_s=ttl_s, max_entries=max_entries))
+    backend = StubBackend(first_token_s=first_token_ms / 1000, tokens_per_s=tokens_per_s)
+    assert gateway.backend("stub") is gateway.backend("stub"), "clients must be pooled"
+    messages = [{"role": "system", "content": "You are a planner."},
+                {"role": "user", "content": "Which zones need more piles?"}]
+
+    cold_first, cold_total, reply = _timed_stream(gateway, backend, messages, context="snapshot-1")
+    warm_first, warm_total, cached = _timed_stream(gateway, backend, messages, context="snapshot-1")
+    assert cached == reply and backend.calls == 1, "repeat request must be served from cache"
+    _, changed_total, _ = _timed_stream(gateway, backend, messages, context="snapshot-2")
+    assert backend.calls == 2, "a new data snapshot must bypass the cache"
+
+    print(f"{'request':<34} {'first chunk ms':>15} {'full reply ms':>14}")
+    print(f"{'cold (streamed)':<34} {cold_first * 1e3:>15.1f} {cold_total * 1e3:>14.1f}")
+    print(f"{'repeat, same snapshot (cache hit)':<34} {warm_first * 1e3:>15.3f} {warm_total * 1e3:>14.3f}")
+    print(f"{'repeat, new data snapshot':<34} {'':>15} {changed_total * 1e3:>14.1f}")
+
+    time.sleep(ttl_s + 0.05)
+    _, expired_total, _ = _timed_stream(gateway, backend, messages, context="snapshot-1")
+    print(f"{'after TTL expiry':<34} {'':>15} {expired_total * 1e3:>14.1f}")
+
+    fast = StubBackend(first_token_s=0, tokens_per_s=1e9, reply_tokens=5)
+    for i in range(max_entries * 2):
+        gateway.chat(fast, [{"role": "user", "content": f"question {i}"}])
+    stats = gateway.cache.stats()
+    assert stats["entries"] <= max_entries
+    print(f"\nCache after {max_entries * 2} distinct prompts: {stats}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-s", type=float, default=60)
+    parser.add_argument("--ttl-s", type=float, default=1.0)
+    parser.add_argument("--max-entries", type=int, default=32)
+    args = parser.parse_args(argv)
+    run(args.first_token_ms, args.tokens_per_s, args.ttl_s, args.max_entries)
+
+if __name__ == "__main__":
+    main()
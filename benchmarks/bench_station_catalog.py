@@ -0,0 +1,80 @@
+"""
+StationCatalog BallTree queries vs. a brute-force pandas haversine scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_station_catalog
+    python -m benchmarks.bench_station_catalog --queries 10000 --k 5 --radius-km 2 --min-piles 10
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+from app.preprocess import DEFAULT_STATION_INFO_PATH
+from app.stations import EARTH_RADIUS_KM, StationCatalog
+from benchmarks.bench_flat_forest import _best_of
+
+def brute_force_nearest(stations: pd.DataFrame, lat: float, lon: float, k: int, min_piles: int) -> pd.DataFrame:
+    """The obvious per-query approach: haversine against every row, then nsmallest."""
+    candidates = stations[stations['charge_count'] >= min_piles]
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(candidates['latitude']), np.radians(candidates['longitude'])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    return candidates.assign(distance_km=distance).nsmallest(k, 'distance_km')
+
+def brute_force_radius(stations: pd.DataFrame, lat: float, lon: float, radius_km: float, min_piles: int) -> pd.DataFrame:
+    ranked = brute_force_nearest(stations, lat, lon, len(stations), min_piles)
+    return ranked[ranked['distance_km'] <= radius_km]
+
+def run(stations: pd.DataFrame, n_queries: int, k: int, radius_km: float, min_piles: int) -> None:
+    start = time.perf_counter()
+    catalog = StationCatalog(stations)
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    # Query points scattered over the network's bounding box
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(stations['latitude'].min(), stations['latitude'].max(), n_queries)
+    lon = rng.uniform(stations['longitude'].min(), stations['longitude'].max(), n_queries)
+
+    # Correctness first: both paths must agree on a sample of queries
+    ids, dists = catalog.nearest(lat, lon, k=k, min_piles=min_piles)
+    radius_ids, _ = catalog.within_radius(lat, lon, radius_km, min_piles=min_piles)
+    for i in range(min(n_queries, 50)):
+        expected = brute_force_nearest(stations, lat[i], lon[i], k, min_piles)
+        np.testing.assert_allclose(dists[i], expected['distance_km'].to_numpy(), rtol=1e-9)
+        expected_radius = brute_force_radius(stations, lat[i], lon[i], radius_km, min_piles)
+        assert set(radius_ids[i]) == set(expected_radius['station_id']), f"radius mismatch at query {i}"
+
+    # The scan is slow enough that a sample gives a stable per-query figure
+    scan_sample = min(n_queries, 200)
+    scan_knn = _best_of(lambda: [brute_force_nearest(stations, lat[i], lon[i], k, min_piles) for i in range(scan_sample)]) / scan_sample
+    scan_radius = _best_of(lambda: [brute_force_radius(stations, lat[i], lon[i], radius_km, min_piles) for i in range(scan_sample)]) / scan_sample
+    tree_knn = _best_of(lambda: catalog.nearest(lat, lon, k=k, min_piles=min_piles)) / n_queries
+    tree_radius = _best_of(lambda: catalog.within_radius(lat, lon, radius_km, min_piles=min_piles)) / n_queries
+    tree_single = _best_of(lambda: [catalog.nearest(lat[i], lon[i], k=k, min_piles=min_piles) for i in range(scan_sample)]) / scan_sample
+
+    print(f"{len(stations)} stations, index built in {build_ms:.2f} ms; {n_queries} queries (k={k}, r={radius_km} km, min_piles={min_piles})")
+    print(f"{'query':<34} {'us/query':>10} {'speedup':>8}")
+    for label, seconds, baseline in [
+        ("pandas scan k-NN", scan_knn, scan_knn),
+        ("catalog k-NN, one call per point", tree_single, scan_knn),
+        ("catalog k-NN, batched", tree_knn, scan_knn),
+        ("pandas scan radius", scan_radius, scan_radius),
+        ("catalog radius, batched", tree_radius, scan_radius),
+    ]:
+        print(f"{label:<34} {seconds * 1e6:>10.2f} {baseline / seconds:>7.1f}x")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--station-info", default=DEFAULT_STATION_INFO_PATH)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius-km", type=float, default=2.0)
+    parser.add_argument("--min-piles", type=int, default=0)
+    args = parser.parse_args(argv)
+    run(pd.read_csv(args.station_info), args.queries, args.k, args.radius_km, args.min_piles)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+In-memory load + resample vs. chunked streaming aggregation of one station's CSV.
+
+Checks that the streaming path is bit-identical to the in-memory one (values, dtypes and
+index) at every chunk size, including chunks that split hours, duplicate runs and
+outages. Also reports wall time and the traced allocation peak of each path.
+
+One station is also rewritten with timestamps outside TIME_FORMAT. The in-memory path
+handles that file with its tolerant reader and the stream must still return the same hours.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream_aggregate
+    python -m benchmarks.bench_stream_aggregate --days 365 --chunksizes 97 10000 500000
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+from typing import Callable, List, Optional, Tuple
+
+from app.preprocess import TIME_FORMAT, aggregate_to_hourly, load_charging_data, stream_hourly_aggregates
+from benchmarks.synthetic import write_station_csvs
+
+def _measure(fn: Callable[[], pd.DataFrame]) -> Tuple[pd.DataFrame, float, float]:
+    """(result, seconds, traced peak MiB) for one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def streamed(path: str, chunksize: int) -> pd.DataFrame:
+    batches = list(stream_hourly_aggregates(path, chunksize))
+    return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+
+# A valid layout that the typed reader's strict TIME_FORMAT rejects
+ALT_TIME_FORMAT = "%Y/%m/%d %H:%M"
+
+def write_alt_format_copy(path: str, out_path: str) -> str:
+    """Copy of a station CSV with its timestamps rewritten in ALT_TIME_FORMAT."""
+    df = pd.read_csv(path)
+    df['time'] = pd.to_datetime(df['time'], format=TIME_FORMAT).dt.strftime(ALT_TIME_FORMAT)
+    df.to_csv(out_path, index=False)
+    return out_path
+
+def check_alt_format(path: str, chunksizes: List[int]) -> None:
+    expected = aggregate_to_hourly(load_charging_data(path))
+    assert not expected.empty, f"in-memory path returned no rows for {path}"
+    for chunksize in chunksizes:
+        actual = streamed(path, chunksize)
+        # The tolerant reader infers float64 where the stream keeps the compact float32 dtypes,
+        # so the values are compared to float32 precision rather than bit for bit
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+        print(f"{'alt-fmt':>8} {chunksize:>10} {len(actual):>12}")
+
+def run(n_stations: int, days: int, chunksizes: List[int]) -> None:
+    csv_dir = tempfile.mkdtemp(prefix="bench-stream-")
+    try:
+        paths = write_station_csvs(csv_dir, n_stations, days, max_workers=1)
+        print(f"{'station':>8} {'chunksize':>10} {'hourly rows':>12} {'seconds':>9} {'peak MiB':>9}")
+        for path in paths:
+            station = path.rsplit("/", 1)[-1].removesuffix(".csv")
+            expected, seconds, peak = _measure(lambda: aggregate_to_hourly(load_charging_data(path)))
+            print(f"{station:>8} {'in-memory':>10} {len(expected):>12} {seconds:>9.3f} {peak:>9.1f}")
+            for chunksize in chunksizes:
+                actual, seconds, peak = _measure(lambda: streamed(path, chunksize))
+                pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+                print(f"{station:>8} {chunksize:>10} {len(actual):>12} {seconds:>9.3f} {peak:>9.1f}")
+        check_alt_format(write_alt_format_copy(paths[0], f"{csv_dir}/alt_format.csv"), chunksizes)
+    finally:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+    print("\nStreaming output matches the in-memory path at every chunk size and timestamp layout.")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--days", type=int, default=60)
+    # 499 and 4999 are deliberately not multiples of the 12 readings per hour, so chunks split hours
+    parser.add_argument("--chunksizes", type=int, nargs="+", default=[499, 4_999, 500_000])
+    args = parser.parse_args(argv)
+    run(args.stations, args.days, args.chunksizes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Closed-loop load generator for the app.serve prediction endpoint.
+
+Start the server, then run from the repository root:
+    python -m app.serve --model models/rf_demand.pkl
+    python -m benchmarks.loadgen_serve --url http://127.0.0.1:8080 --concurrency 32 --duration 10
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+import numpy as np
+from urllib.parse import urlparse
+from typing import List, Optional
+
+def _random_instance(rng: random.Random) -> dict:
+    return {
+        "hour": rng.randrange(24),
+        "day_of_week": rng.randrange(7),
+        "s_price": round(rng.uniform(0.2, 1.0), 2),
+        "e_price": round(rng.uniform(0.5, 1.5), 2),
+    }
+
+def _client(url: str, deadline: float, rows: int, seed: int, latencies: List[float], errors: List[int]) -> None:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port)
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        body = json.dumps({"instances": [_random_instance(rng) for _ in range(rows)]})
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/predict", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append(-1)
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def run(url: str, concurrency: int, duration: float, rows: int) -> None:
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_client, args=(url, deadline, rows, i, latencies, errors))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    print(f"requests: {len(latencies)}  errors: {len(errors)}  elapsed: {elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} req/s ({len(latencies) * rows / elapsed:,.0f} rows/s)")
+    print(f"latency ms: p50={np.percentile(lat_ms, 50):.2f} p95={np.percentile(lat_ms, 95):.2f} p99={np.percentile(lat_ms, 99):.2f}")
+
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port)
+    conn.request("GET", "/metrics")
+    print("server metrics:", json.dumps(json.loads(conn.getresponse().read()), indent=2))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=1, help="Instances per request.")
+    args = parser.parse_args(argv)
+    run(args.url, args.concurrency, args.duration, args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Per-stage performance suite with stored baselines and regression flags.
+
+Stages: ingest (CSV -> typed frame), aggregate (5-minute -> hourly, per station and
+network-wide), features (engineer_features + FeatureTransform), fit, and single-row and
+batch predict on each inference engine (FlatForest and sklearn). Each is timed best-of-N on
+synthetic UrbanEV-shaped data at a given scale.
+
+Run from the repository root:
+    python -m benchmarks.suite --save-baseline               # record this machine's baseline
+    python -m benchmarks.suite                               # compare against it; flags slow stages
+    python -m benchmarks.suite --stations 200 --days 56 --fail-on-regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.features import FeatureTransform
+from app.model import FlatForest, build_forest
+from app.preprocess import aggregate_network_hourly, aggregate_to_hourly, engineer_features, load_charging_data
+from benchmarks.synthetic import network_telemetry, write_station_csvs
+
+DEFAULT_BASELINE_PATH = "benchmarks/baseline.json"
+DEFAULT_TOLERANCE = 0.25  # flag stages more than 25% slower than baseline
+# Both engines at both batch sizes, so a regression in either one shows up wherever it bites
+PREDICT_ENGINES = ("flat", "sklearn")
+STAGES = ("ingest", "aggregate_station", "aggregate_network", "features", "transform", "fit") + tuple(
+    f"predict_{size}_{engine}" for engine in PREDICT_ENGINES for size in ("single", "batch"))
+
+def best_of(fn: Callable[[], Any], repeats: int = 3, budget_s: float = 5.0) -> float:
+    """Minimum wall time over up to `repeats` runs, stopping early once budget_s is spent."""
+    timings = []
+    deadline = time.perf_counter() + budget_s
+    while len(timings) < repeats and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+def scale_key(n_stations: int, days: int) -> str:
+    return f"{n_stations}x{days}d"
+
+def run_stages(n_stations: int, days: int, repeats: int = 3, seed: int = 0,
+               stages: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """Times each requested stage on one synthetic dataset. Returns {stage: {seconds, rows, rows_per_s}}."""
+    stages = list(stages or STAGES)
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(stage: str, seconds: float, rows: int) -> None:
+        results[stage] = {"seconds": seconds, "rows": rows, "rows_per_s": rows / seconds if seconds > 0 else 0.0}
+        print(f"  {stage:<24} {seconds * 1e3:>11.2f} ms {rows:>10,} rows {rows / seconds:>14,.0f} rows/s", flush=True)
+
+    csv_dir = tempfile.mkdtemp(prefix="bench-suite-")
+    try:
+        if "ingest" in stages:
+            paths = write_station_csvs(csv_dir, n_stations, days, seed=seed)
+            rows = sum(len(load_charging_data(p)) for p in paths)
+            record("ingest", best_of(lambda: [load_charging_data(p) for p in paths], repeats), rows)
+    finally:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+
+    # Later stages each build on the previous one's output; stop as soon as nothing selected needs more
+    if stages == ["ingest"]:
+        return results
+    raw = network_telemetry(n_stations, days, seed=seed).drop_duplicates()
+    station = raw[raw['station_id'] == raw['station_id'].iloc[0]].drop(columns='station_id')
+    if "aggregate_station" in stages:
+        record("aggregate_station", best_of(lambda: aggregate_to_hourly(station.copy()), repeats), len(station))
+    if "aggregate_network" in stages:
+        record("aggregate_network", best_of(lambda: aggregate_network_hourly(raw), repeats), len(raw))
+
+    unengineered = aggregate_network_hourly(raw).dropna(subset=['volume'])
+    if "features" in stages:
+        record("features", best_of(lambda: engineer_features(unengineered.copy()), repeats), len(unengineered))
+    hourly = engineer_features(unengineered)
+    transform = FeatureTransform()
+    if "transform" in stages:
+        record("transform", best_of(lambda: transform.transform(hourly), repeats), len(hourly))
+
+    predict_stages = [stage for stage in stages if stage.startswith("predict_")]
+    if "fit" not in stages and not predict_stages:
+        return results
+    X, y = transform.transform(hourly), hourly['volume'].to_numpy()
+    if "fit" in stages:
+        record("fit", best_of(lambda: build_forest().fit(X, y), repeats=min(repeats, 2), budget_s=60.0), len(X))
+    if not predict_stages:
+        return results
+
+    # Fitted only now, so runs without a predict stage never pay for a forest they do not time
+    model = build_forest().fit(X, y)
+    engines = {"sklearn": model}
+    if any(stage.endswith("_flat") for stage in predict_stages):
+        engines = {"flat": FlatForest.from_sklearn(model), **engines}
+    single, batch = X[:1], X[:10_000]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        for name, engine in engines.items():
+            if f"predict_single_{name}" in stages:
+                record(f"predict_single_{name}", best_of(lambda: [engine.predict(single) for _ in range(100)], repeats) / 100, 1)
+            if f"predict_batch_{name}" in stages:
+                record(f"predict_batch_{name}", best_of(lambda: engine.predict(batch), repeats), len(batch))
+    return results
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Prints the ratio to baseline per stage and returns the stages slower than 1 + tolerance."""
+    regressions = []
+    print(f"\n{'stage':<24} {'baseline ms':>12} {'now ms':>10} {'ratio':>7}")
+    for stage, now in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            print(f"{stage:<24} {'-':>12} {now['seconds'] * 1e3:>10.2f} {'new':>7}")
+            continue
+        ratio = now["seconds"] / base["seconds"]
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{stage:<24} {base['seconds'] * 1e3:>12.2f} {now['seconds'] * 1e3:>10.2f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=20)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="JSON file of stored baselines, keyed by scale.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline for its scale.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero if any stage regressed.")
+    args = parser.parse_args(argv)
+
+    key = scale_key(args.stations, args.days)
+    print(f"Benchmark suite at {key} ({args.stations} stations x {args.days} days)")
+    results = run_stages(args.stations, args.days, args.repeats, stages=args.stages)
+
+    baselines = load_baselines(args.baseline)
+    stored = baselines.get(key)
+    regressions: List[str] = []
+    if stored is not None:
+        if stored.get("environment") != environment():
+            print(f"Note: baseline was recorded on a different environment: {stored.get('environment')}")
+        regressions = compare(results, stored["results"], args.tolerance)
+    elif not args.save_baseline:
+        print(f"\nNo baseline for {key} in {args.baseline}; run with --save-baseline to record one.")
+
+    if args.save_baseline:
+        # Keep results for stages not rerun this time
+        merged = {**(stored or {}).get("results", {}), **results}
+        baselines[key] = {"recorded_at": pd.Timestamp.now().isoformat(), "environment": environment(), "results": merged}
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"\nBaseline for {key} saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
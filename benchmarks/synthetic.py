@@ -0,0 +1,135 @@
+"""
+Synthetic UrbanEV-shaped 5-minute telemetry for benchmarks.
+
+Station IDs and pile counts come from station_information.csv (extra IDs are minted past the
+real ones when more stations are requested). Each station gets a daily/weekly demand cycle,
+a time-of-use electricity tariff, duplicate transmissions and reporting gaps, so every cleaning
+branch of app.preprocess does real work.
+
+Run from the repository root:
+    python -m benchmarks.synthetic --out /tmp/charge_5min --stations 100 --days 28
+    python train_model.py --stations all --data-dir /tmp/charge_5min
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from app.preprocess import (DEFAULT_STATION_INFO_PATH, TELEMETRY_DTYPES, TIME_FORMAT, aggregate_network_hourly,
+                            engineer_features)
+
+DEFAULT_START = "2022-09-01"
+STEPS_PER_DAY = 288
+DUPLICATE_RATE = 0.002    # share of readings transmitted twice
+DROP_RATE = 0.03          # share of isolated missing readings
+OUTAGES_PER_WEEK = 0.5    # multi-hour silences, longer than the gap-fill limit
+
+def load_stations(n_stations: int, station_info_path: str = DEFAULT_STATION_INFO_PATH, seed: int = 0) -> pd.DataFrame:
+    """
+    The first n_stations (station_id, charge_count) rows of station_information.csv. Beyond the
+    real network, further IDs continue after the largest real one with resampled pile counts.
+    Without the CSV, IDs start at 1001 and pile counts are drawn from a similar distribution.
+    """
+    if os.path.exists(station_info_path):
+        info = pd.read_csv(station_info_path, usecols=['station_id', 'charge_count'])
+    else:
+        info = pd.DataFrame({'station_id': pd.Series([], dtype=np.int64), 'charge_count': pd.Series([], dtype=np.int64)})
+    stations = info.head(n_stations)
+    extra = n_stations - len(stations)
+    if extra > 0:
+        rng = np.random.default_rng(seed)
+        first_id = int(info['station_id'].max()) + 1 if len(info) else 1001
+        piles = rng.choice(info['charge_count'].to_numpy(), extra) if len(info) else rng.integers(2, 40, extra)
+        stations = pd.concat([stations, pd.DataFrame({'station_id': np.arange(first_id, first_id + extra), 'charge_count': piles})],
+                             ignore_index=True)
+    return stations.reset_index(drop=True)
+
+def station_telemetry(station_id: int, piles: int, days: int, start: str = DEFAULT_START,
+                      seed: int = 0) -> pd.DataFrame:
+    """
+    One station's 5-minute readings in load_charging_data's output dtypes, sorted by time,
+    with duplicates, isolated drops and multi-hour outages already applied.
+    """
+    rng = np.random.default_rng([seed, int(station_id)])
+    stamps = pd.date_range(start, periods=days * STEPS_PER_DAY, freq="5min")
+    n = len(stamps)
+    hour = stamps.hour.to_numpy() + stamps.minute.to_numpy() / 60
+    weekend = stamps.dayofweek.to_numpy() >= 5
+
+    # Utilisation peaks in the evening, dips overnight and softens at weekends
+    utilisation = 0.35 + 0.3 * np.sin(2 * np.pi * (hour - 12) / 24) - 0.1 * weekend
+    utilisation = np.clip(utilisation + rng.normal(0, 0.1, n), 0, 1)
+    busy = rng.binomial(max(int(piles), 1), utilisation)
+    e_price = np.where((hour >= 8) & (hour < 22), 1.05, 0.45) + rng.choice([0.0, 0.05], n, p=[0.9, 0.1])
+    s_price = np.full(n, rng.choice([0.4, 0.5, 0.6, 0.8]))
+
+    frame = pd.DataFrame({
+        'time': stamps,
+        'busy': busy,
+        'idle': max(int(piles), 1) - busy,
+        's_price': s_price,
+        'e_price': e_price,
+        'duration': busy * rng.uniform(3.0, 5.0, n) / 12,
+        'volume': busy * rng.uniform(4.0, 7.0, n) / 12,
+    }).astype(TELEMETRY_DTYPES)
+
+    keep = rng.random(n) >= DROP_RATE
+    for _ in range(rng.poisson(OUTAGES_PER_WEEK * days / 7)):
+        begin = rng.integers(0, n)
+        keep[begin:begin + rng.integers(3 * 12, 24 * 12)] = False
+    frame = frame[keep]
+    duplicates = frame[rng.random(len(frame)) < DUPLICATE_RATE]
+    return pd.concat([frame, duplicates]).sort_values('time', kind='stable').reset_index(drop=True)
+
+def network_telemetry(n_stations: int, days: int, start: str = DEFAULT_START, seed: int = 0,
+                      station_info_path: str = DEFAULT_STATION_INFO_PATH) -> pd.DataFrame:
+    """All stations' telemetry as one long frame with a station_id column, station-major."""
+    stations = load_stations(n_stations, station_info_path, seed)
+    frames = [station_telemetry(sid, piles, days, start, seed).assign(station_id=sid)
+              for sid, piles in zip(stations['station_id'], stations['charge_count'])]
+    frame = pd.concat(frames, ignore_index=True)
+    return frame[['station_id'] + [c for c in frame.columns if c != 'station_id']]
+
+def network_hourly(n_stations: int, days: int, start: str = DEFAULT_START, seed: int = 0,
+                   station_info_path: str = DEFAULT_STATION_INFO_PATH) -> pd.DataFrame:
+    """Cleaned, feature-engineered hourly rows (what training consumes), without writing any CSVs."""
+    raw = network_telemetry(n_stations, days, start, seed, station_info_path).drop_duplicates()
+    return engineer_features(aggregate_network_hourly(raw).dropna(subset=['volume']))
+
+def _write_station(out_dir: str, station_id: int, piles: int, days: int, start: str, seed: int) -> str:
+    path = os.path.join(out_dir, f"{station_id}.csv")
+    station_telemetry(station_id, piles, days, start, seed).to_csv(path, index=False, date_format=TIME_FORMAT,
+                                                                   float_format="%.4f")
+    return path
+
+def write_station_csvs(out_dir: str, n_stations: int, days: int, start: str = DEFAULT_START, seed: int = 0,
+                       station_info_path: str = DEFAULT_STATION_INFO_PATH, max_workers: Optional[int] = None) -> List[str]:
+    """Writes one charge_5min-style <station_id>.csv per station, generated in parallel. Returns the paths."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    stations = load_stations(n_stations, station_info_path, seed)
+    jobs = [(out_dir, int(sid), int(piles), days, start, seed)
+            for sid, piles in zip(stations['station_id'], stations['charge_count'])]
+    if (max_workers or os.cpu_count() or 1) <= 1 or len(jobs) == 1:
+        return [_write_station(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_write_station, *zip(*jobs)))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", required=True, help="Directory for the generated <station_id>.csv files.")
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--station-info", default=DEFAULT_STATION_INFO_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    paths = write_station_csvs(args.out, args.stations, args.days, args.start, args.seed, args.station_info, args.workers)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"Wrote {len(paths)} station files ({args.days} days each, {total / 1024 ** 2:.1f} MiB) to {args.out}")
+
+if __name__ == "__main__":
+    main()
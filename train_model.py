@@ -1,11 +1,26 @@
 import os
 import sys
+import glob
+import time
+import argparse
 import logging
+import numpy as np
 import pandas as pd
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 # Directly import the unified structural pipeline rather than reinventing it here
-from app.preprocess import process_station_pipeline
-from app.model import train_demand_model, save_model
+from app.preprocess import process_stations_parallel, DEFAULT_STATION_INFO_PATH
+from app.preprocess_cache import DEFAULT_CACHE_DIR
+from app.model import (train_demand_model, save_model, load_artifact, build_forest, build_hist_gbm, evaluate_model,
+                       grow_forest, train_on_memmap, save_training_set, load_training_set)
+from app.backtest import run_backtest
+from app.shards import train_zone_shards, load_station_zones
+from app.rollups import refresh_history_rollups, training_set_history, DEFAULT_ROLLUP_DIR
+from app.profiling import add_profiling_args, peak_rss_mb, session_from_args, timed
+from app.dataset import MemmapTrainingSet, holdout_mask, stratified_sample
+from app.features import FeatureTransform, RAW_FIELDS
 
 # Establish production-grade console logger
 logging.basicConfig(
@@ -19,59 +34,406 @@ logger = logging.getLogger(__name__)
 DATA_DIR = "data/raw/UrbanEVDataset/UrbanEVDataset/20220901-20230228_station-raw/charge_5min"
 STATIONS_TO_TRAIN = ["1001.csv", "1002.csv", "1003.csv", "1006.csv", "1008.csv"]
 MODEL_PATH = "models/rf_demand.pkl"
+FLAT_MODEL_PATH = "models/rf_demand"
+TRAINING_SET_PATH = "models/training_set.npz"
+MEMMAP_DIR = "models/.train_memmap"
+TARGET = 'volume'
 
-def main():
-    logger.info("Initializing EV Demand Model Training Pipeline...")
-    all_data = []
-    
-    # 1. Ingest & Engineer Data Space
-    for station_filename in STATIONS_TO_TRAIN:
-        path = os.path.join(DATA_DIR, station_filename)
-        if not os.path.exists(path):
-            logger.warning(f"Target dataset {station_filename} skipped (File not found).")
+def resolve_station_files(selector: Optional[str] = None, data_dir: str = DATA_DIR) -> List[str]:
+    """
+    Expands a station selector into concrete CSV paths.
+    None keeps the curated STATIONS_TO_TRAIN list, 'all' takes every CSV in data_dir,
+    and anything else is treated as a glob (relative globs resolve inside data_dir). Files whose
+    name is not a numeric station ID are skipped with a warning.
+    """
+    if selector is None:
+        return [os.path.join(data_dir, name) for name in STATIONS_TO_TRAIN]
+    if selector == "all":
+        selector = "*.csv"
+    pattern = selector if os.path.isabs(selector) else os.path.join(data_dir, selector)
+    paths = []
+    for path in sorted(glob.glob(pattern)):
+        # Station exports are named by numeric ID; stray CSVs (backups, notes) are not telemetry
+        if not Path(path).stem.isdigit():
+            logger.warning(f"Skipping {os.path.basename(path)}: not a <station_id>.csv telemetry export")
             continue
-            
-        try:
-            # Leverage our newly refactored, robust engineering pipeline
-            processed_df = process_station_pipeline(path)
-            all_data.append(processed_df)
-            logger.info(f"Successfully digested {len(processed_df)} hourly shards from {station_filename}")
-        except Exception as e:
-            logger.error(f"Failed to process {station_filename} due to data corruption/schema mismatch. Err: {e}")
+        paths.append(path)
+    return paths
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the hourly EV demand model.")
+    parser.add_argument("--stations", default=None,
+                        help="'all' for every CSV in --data-dir, or a glob such as '10*.csv'. Defaults to the curated station list.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory holding the charge_5min station CSVs.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Ingestion worker processes (default: all cores, 1 disables the pool).")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Columnar cache of preprocessed station frames.")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-parse the raw CSVs.")
+    parser.add_argument("--cache-hash-content", action="store_true",
+                        help="Also key the cache on each CSV's SHA-256, for copies whose mtimes cannot be trusted.")
+    parser.add_argument("--artifact-format", choices=["pickle", "flat"], default="pickle",
+                        help="'flat' writes a pickle-free, memory-mappable artifact directory.")
+    parser.add_argument("--model-path", default=None,
+                        help=f"Output artifact path (default: {MODEL_PATH}, or {FLAT_MODEL_PATH} for --artifact-format flat).")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream each CSV in chunks of this many rows (for exports larger than memory).")
+    parser.add_argument("--training-set", default=TRAINING_SET_PATH,
+                        help="Stored feature/target matrix that incremental runs append to.")
+    parser.add_argument("--mode", choices=["memory", "memmap", "hgb"], default="memory",
+                        help="memory: concat all stations in RAM. memmap: stream stations into an on-disk float32 "
+                             "matrix and fit from it. hgb: histogram gradient boosting on stratified per-station samples.")
+    parser.add_argument("--backtest-folds", type=int, default=0,
+                        help="Also run this many parallel rolling-origin folds and store the table in the artifact metrics.")
+    parser.add_argument("--shard-dir", default=None,
+                        help="Also train one model per TAZID zone (in parallel) into this shard registry directory.")
+    parser.add_argument("--station-info", default=DEFAULT_STATION_INFO_PATH, help="station_information.csv with TAZID zones.")
+    parser.add_argument("--shard-min-rows", type=int, default=500,
+                        help="Zones with fewer hourly rows are left to the global model.")
+    parser.add_argument("--rollup-dir", default=DEFAULT_ROLLUP_DIR,
+                        help="Where to materialize zone/network rollups from the ingested history.")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip rebuilding the rollup tables.")
+    parser.add_argument("--memmap-dir", default=MEMMAP_DIR, help="Scratch directory for --mode memmap.")
+    parser.add_argument("--sample-per-station", type=int, default=2000,
+                        help="Hourly rows sampled from each station in --mode hgb.")
 
+    incremental = parser.add_argument_group("incremental retraining")
+    incremental.add_argument("--incremental", action="store_true",
+                             help="Only ingest telemetry newer than the artifact's watermarks and warm-start extra trees.")
+    incremental.add_argument("--add-estimators", type=int, default=10, help="Trees grown per incremental run.")
+    incremental.add_argument("--max-estimators", type=int, default=200,
+                             help="Forest size cap; the oldest trees are retired beyond it.")
+    incremental.add_argument("--recent-days", type=float, default=14.0,
+                             help="History window (before the new data) the new trees also see.")
+    incremental.add_argument("--compare-full", action="store_true",
+                             help="Also run a full retrain and report the time/accuracy trade-off.")
+    add_profiling_args(parser)
+    return parser.parse_args(argv)
+
+def station_id_from_path(path: str) -> int:
+    """charge_5min exports are named by station, e.g. .../1001.csv -> 1001."""
+    return int(Path(path).stem)
+
+def iter_station_frames(args: argparse.Namespace, station_files: List[str],
+                        watermarks: Optional[Dict[str, str]] = None):
+    """
+    Yields (path, frame) per station as pool workers finish, each frame tagged with station_id.
+    With watermarks, only rows newer than each station's mark are kept.
+    """
+    logger.info(f"Scheduling {len(station_files)} station files for ingestion (workers={args.workers or os.cpu_count()})")
+    cache_dir = None if args.no_cache else args.cache_dir
+    for path, processed_df in process_stations_parallel(station_files, max_workers=args.workers,
+                                                         cache_dir=cache_dir, chunksize=args.chunksize,
+                                                         hash_content=args.cache_hash_content):
+        station_id = station_id_from_path(path)
+        if watermarks and str(station_id) in watermarks and not processed_df.empty:
+            processed_df = processed_df[processed_df['time'] > pd.Timestamp(watermarks[str(station_id)])]
+        logger.info(f"Successfully digested {len(processed_df)} hourly shards from {os.path.basename(path)}")
+        yield path, processed_df.assign(station_id=station_id)
+
+@timed("train.ingest_stations")
+def ingest_stations(args: argparse.Namespace, station_files: List[str],
+                    watermarks: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Runs the preprocessing pipeline over station_files and returns one master table."""
+    all_data = list(iter_station_frames(args, station_files, watermarks))
     if not all_data:
+        return pd.DataFrame()
+
+    # Compile the ultimate master table. Workers finish in arbitrary order, so restore
+    # a stable station order to keep the seeded train/test split reproducible.
+    all_data.sort(key=lambda item: item[0])
+    return pd.concat([df for _, df in all_data], ignore_index=True)
+
+@timed("train.extract_vectors", rows=lambda result, full_df, transform: len(full_df))
+def extract_vectors(full_df: pd.DataFrame, transform: FeatureTransform) -> Tuple[np.ndarray, np.ndarray]:
+    # Validate feature integrity before model fit
+    missing_cols = [f for f in RAW_FIELDS + (TARGET,) if f not in full_df.columns]
+    if missing_cols:
+        logger.critical(f"Dataframe missing engineered features necessary for prediction: {missing_cols}")
+        sys.exit(1)
+    # The shared FeatureTransform builds the matrix from raw fields, exactly as serving will
+    return transform.transform(full_df), full_df[TARGET].to_numpy()
+
+def trained_at_epoch(trained_at: Any) -> float:
+    """
+    The artifact's trained_at as epoch seconds, comparable with os.path.getmtime. Older artifacts
+    stored a naive local-time ISO string, which is read back in local time for the same reason.
+    """
+    if isinstance(trained_at, str):
+        return datetime.fromisoformat(trained_at).timestamp()
+    return float(trained_at)
+
+def compute_watermarks(full_df: pd.DataFrame, previous: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Latest ingested hour per station, merged over the previous run's marks."""
+    watermarks = dict(previous or {})
+    if not full_df.empty:
+        for station_id, latest in full_df.groupby('station_id')['time'].max().items():
+            watermarks[str(station_id)] = latest.isoformat()
+    return watermarks
+
+def report_metrics(metrics: Dict[str, float]) -> None:
+    logger.info("--- Model Efficacy Report ---")
+    logger.info(f"Mean Absolute Error : {metrics['MAE']:.3f} kWh")
+    logger.info(f"Root Mean Sq. Error : {metrics['RMSE']:.3f} kWh")
+    logger.info(f"Validation Sample Sz: {metrics['Test_Samples']}")
+    if "Peak_RSS_MB" in metrics:
+        logger.info(f"Peak RSS (trainer)  : {metrics['Peak_RSS_MB']:.1f} MiB")
+        logger.info(f"Peak RSS (workers)  : {metrics['Peak_Worker_RSS_MB']:.1f} MiB")
+
+def refresh_rollups(args: argparse.Namespace, hourly: Optional[pd.DataFrame] = None) -> None:
+    """
+    Refreshes the history rollups after any training mode, keeping the last forecast's peaks.
+    Without an in-memory master table, history comes from the training set just persisted.
+    """
+    if args.no_rollups:
+        return
+    if not os.path.exists(args.station_info):
+        logger.warning(f"Station information not found at {args.station_info}; rollups not refreshed")
+        return
+    sources = {"station_info": args.station_info, "history": args.data_dir}
+    if hourly is None:
+        training_set = load_training_set(args.training_set)
+        if training_set is None:
+            logger.warning(f"No training set at {args.training_set}; rollups not refreshed")
+            return
+        hourly = training_set_history(training_set)
+        sources["history"] = args.training_set
+    refresh_history_rollups(pd.read_csv(args.station_info), hourly, args.rollup_dir, sources)
+
+def run_memmap(args: argparse.Namespace, model_path: str, started_at: float) -> None:
+    """
+    Out-of-core training: each station frame is transformed and appended to a float32 memory map
+    as soon as its worker finishes, then the forest fits straight from the map. No master
+    DataFrame is ever built, so peak RSS is one station frame plus the fit's own working set.
+    """
+    transform = FeatureTransform()
+    dataset = MemmapTrainingSet(args.memmap_dir, n_features=len(transform.features))
+    watermarks: Dict[str, str] = {}
+    for _, frame in iter_station_frames(args, resolve_station_files(args.stations, args.data_dir)):
+        if frame.empty:
+            continue
+        X, y = extract_vectors(frame, transform)
+        dataset.append(X, y, frame['time'].to_numpy(dtype="datetime64[ns]"), frame['station_id'].to_numpy())
+        watermarks.update(compute_watermarks(frame))
+        del frame, X, y
+
+    if dataset.rows == 0:
         logger.critical("Pipeline aborted. Zero datasets successfully loaded.")
         sys.exit(1)
+    arrays = dataset.arrays()
+    logger.info(f"Memory-mapped training matrix compiled: {dataset.rows} rows, {dataset.nbytes() / 1024 ** 2:.1f} MiB on disk")
+
+    logger.info("Engaging Random Forest Regressor architecture...")
+    model, metrics = train_on_memmap(arrays["X"], arrays["y"], holdout_mask(arrays["station_id"], arrays["time"]))
+    metrics.update({"Mode": "memmap", **(peak_rss_mb() or {})})
+    report_metrics(metrics)
+
+    save_training_set(args.training_set, arrays["X"], arrays["y"], arrays["time"], arrays["station_id"])
+    dataset.close(remove=True)
+    save_model(model, metrics, model_path, artifact_format=args.artifact_format, feature_spec=transform.to_spec(),
+               metadata={"trained_at": started_at, "watermarks": watermarks})
+    refresh_rollups(args)
+
+def run_sampled(args: argparse.Namespace, model_path: str, started_at: float) -> None:
+    """
+    Bounded-memory alternative: keep only a stratified sample of each station as it arrives and
+    fit histogram gradient boosting on the union. Memory scales with stations x sample size.
+    The full feature matrix still streams into a disk-backed set, so the stored training set
+    (which incremental runs, forecasts and rollups read) covers every ingested row.
+    """
+    transform = FeatureTransform()
+    dataset = MemmapTrainingSet(args.memmap_dir, n_features=len(transform.features))
+    samples = []
+    watermarks: Dict[str, str] = {}
+    for path, frame in iter_station_frames(args, resolve_station_files(args.stations, args.data_dir)):
+        if frame.empty:
+            continue
+        samples.append((path, stratified_sample(frame, args.sample_per_station)))
+        X_full, y_full = extract_vectors(frame, transform)
+        dataset.append(X_full, y_full, frame['time'].to_numpy(dtype="datetime64[ns]"), frame['station_id'].to_numpy())
+        watermarks.update(compute_watermarks(frame))
+        del frame, X_full, y_full
+
+    if not samples:
+        dataset.close(remove=True)
+        logger.critical("Pipeline aborted. Zero datasets successfully loaded.")
+        sys.exit(1)
+    samples.sort(key=lambda item: item[0])
+    sample_df = pd.concat([df for _, df in samples], ignore_index=True)
+    logger.info(f"Stratified sample compiled: {len(sample_df)} rows from {len(samples)} stations")
+
+    X, y = extract_vectors(sample_df, transform)
+    logger.info("Engaging Histogram Gradient Boosting architecture...")
+    model, metrics = train_demand_model(X, y, model=build_hist_gbm())
+    metrics.update({"Mode": "hgb", "Sampled_Rows": len(sample_df), **(peak_rss_mb() or {})})
+    report_metrics(metrics)
+
+    arrays = dataset.arrays()
+    save_training_set(args.training_set, arrays["X"], arrays["y"], arrays["time"], arrays["station_id"])
+    dataset.close(remove=True)
+    save_model(model, metrics, model_path, artifact_format="pickle", feature_spec=transform.to_spec(),
+               metadata={"trained_at": started_at, "watermarks": watermarks})
+    refresh_rollups(args)
 
-    # Compile the ultimate master table
-    full_df = pd.concat(all_data, ignore_index=True)
+def run_incremental(args: argparse.Namespace, model_path: str) -> None:
+    """
+    Warm-start retraining: ingest only telemetry past the last run's watermarks, grow a few
+    trees on the recent window, and append the new rows to the stored training set.
+    """
+    artifact = load_artifact(model_path)
+    history = load_training_set(args.training_set)
+    if artifact is None or history is None or not artifact.get("metadata", {}).get("watermarks"):
+        logger.critical("Incremental mode needs a previous pickle artifact with watermarks and its stored "
+                        "training set. Run a full training first.")
+        sys.exit(1)
+    # Only a random forest can grow extra trees; a --mode hgb boosting model has to be retrained in full
+    if not hasattr(artifact["model"], "estimators_"):
+        logger.critical(f"Incremental mode warm-starts random forest trees, but {model_path} holds a "
+                        f"{type(artifact['model']).__name__}. Run a full training instead.")
+        sys.exit(1)
+    metadata = artifact["metadata"]
+    transform = FeatureTransform.from_spec(artifact.get("features"))
+
+    # Stamp before ingestion so files appended to during this run are re-examined by the next one
+    started_at = time.time()
+
+    # Files untouched since the last run cannot hold new telemetry; skip them before any parsing
+    trained_at = trained_at_epoch(metadata["trained_at"])
+    watermarks = metadata["watermarks"]
+    station_files = [
+        path for path in resolve_station_files(args.stations, args.data_dir)
+        if os.path.exists(path) and (str(station_id_from_path(path)) not in watermarks or os.path.getmtime(path) > trained_at)
+    ]
+    new_df = ingest_stations(args, station_files, watermarks)
+    if new_df.empty:
+        logger.info("No telemetry newer than the stored watermarks. Artifact left unchanged.")
+        return
+    new_df = new_df.sort_values('time', kind='stable').reset_index(drop=True)
+    X_new, y_new = extract_vectors(new_df, transform)
+    logger.info(f"Found {len(new_df)} new hourly rows across {new_df['station_id'].nunique()} stations")
+
+    # Hold out the newest 20% of arrivals: a forecasting model should be judged on the future
+    split = int(len(new_df) * 0.8)
+    window_start = np.datetime64(new_df['time'].iloc[0] - pd.Timedelta(days=args.recent_days))
+    recent = history["time"] >= window_start
+    X_fit = np.concatenate([history["X"][recent], X_new[:split]])
+    y_fit = np.concatenate([history["y"][recent], y_new[:split]])
+
+    start = time.perf_counter()
+    model, replaced = grow_forest(artifact["model"], X_fit, y_fit, args.add_estimators, args.max_estimators)
+    incremental_s = time.perf_counter() - start
+    metrics = evaluate_model(model, X_new[split:], y_new[split:])
+    metrics.update({"Mode": "incremental", "Fit_Seconds": incremental_s, "Trees": len(model.estimators_),
+                    "Trees_Replaced": replaced, "New_Rows": len(new_df)})
+    report_metrics(metrics)
+
+    if args.compare_full:
+        start = time.perf_counter()
+        full_model = build_forest().fit(np.concatenate([history["X"], X_new[:split]]),
+                                        np.concatenate([history["y"], y_new[:split]]))
+        full_s = time.perf_counter() - start
+        full_metrics = evaluate_model(full_model, X_new[split:], y_new[split:])
+        metrics.update({"Full_Retrain_Seconds": full_s, "Full_Retrain_MAE": full_metrics["MAE"],
+                        "Full_Retrain_RMSE": full_metrics["RMSE"]})
+        logger.info("--- Incremental vs Full Retrain (same newest-hours holdout) ---")
+        logger.info(f"Incremental : {incremental_s:8.2f}s  MAE {metrics['MAE']:.3f}  RMSE {metrics['RMSE']:.3f}")
+        logger.info(f"Full retrain: {full_s:8.2f}s  MAE {full_metrics['MAE']:.3f}  RMSE {full_metrics['RMSE']:.3f}")
+        logger.info(f"Speedup {full_s / max(incremental_s, 1e-9):.1f}x for a {metrics['MAE'] - full_metrics['MAE']:+.3f} kWh MAE change")
+
+    save_training_set(args.training_set,
+                      np.concatenate([history["X"], X_new]), np.concatenate([history["y"], y_new]),
+                      np.concatenate([history["time"], new_df['time'].to_numpy(dtype="datetime64[ns]")]),
+                      np.concatenate([history["station_id"], new_df['station_id'].to_numpy()]))
+    metadata = {**metadata, "trained_at": started_at,
+                "watermarks": compute_watermarks(new_df, watermarks)}
+    save_model(model, metrics, model_path, artifact_format="pickle", feature_spec=transform.to_spec(), metadata=metadata)
+    refresh_rollups(args)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    with session_from_args(args):
+        train(args)
+
+def train(args: argparse.Namespace) -> None:
+    logger.info("Initializing EV Demand Model Training Pipeline...")
+    model_path = args.model_path or (FLAT_MODEL_PATH if args.artifact_format == "flat" else MODEL_PATH)
+
+    # Backtests and shards are built from the in-memory master table, which only the full memory mode has
+    if (args.incremental or args.mode != "memory") and (args.backtest_folds or args.shard_dir):
+        run_kind = "--incremental" if args.incremental else f"--mode {args.mode}"
+        logger.critical(f"--backtest-folds and --shard-dir need a full --mode memory run; {run_kind} cannot honour them.")
+        sys.exit(1)
+
+    if args.incremental:
+        if args.artifact_format != "pickle":
+            logger.critical("Incremental mode warm-starts sklearn trees and needs --artifact-format pickle.")
+            sys.exit(1)
+        run_incremental(args, model_path)
+        return
+
+    # Stamp before ingestion so files rewritten mid-run are re-examined by the next incremental run.
+    # Epoch seconds, like os.path.getmtime, so the comparison does not depend on the local timezone.
+    started_at = time.time()
+    # The scratch directory is wiped before use, so never take over one holding anything else
+    if args.mode != "memory" and not MemmapTrainingSet.is_reusable(args.memmap_dir):
+        logger.critical(f"--memmap-dir {args.memmap_dir} is not empty and is not a previous memmap scratch "
+                        f"directory; refusing to clear it.")
+        sys.exit(1)
+    if args.mode == "hgb":
+        if args.artifact_format != "pickle":
+            logger.critical("--mode hgb produces a boosting model, which only the pickle artifact format can hold.")
+            sys.exit(1)
+        run_sampled(args, model_path, started_at)
+        return
+    if args.mode == "memmap":
+        run_memmap(args, model_path, started_at)
+        return
+    
+    # 1. Ingest & Engineer Data Space
+    full_df = ingest_stations(args, resolve_station_files(args.stations, args.data_dir))
+    if full_df.empty:
+        logger.critical("Pipeline aborted. Zero datasets successfully loaded.")
+        sys.exit(1)
     logger.info(f"Unified dataset compiled. Absolute row count: {len(full_df)}")
     
     # 2. Extract Vectors
     # Note: We now utilize the cyclical time features to respect physical clock boundaries
-    target = 'volume'
-    features = ['hour_sin', 'hour_cos', 'day_of_week', 'is_weekend', 's_price', 'e_price']
-    
-    # Validate feature integrity before model fit
-    missing_cols = [f for f in features if f not in full_df.columns]
-    if missing_cols:
-        logger.critical(f"Dataframe missing engineered features necessary for prediction: {missing_cols}")
-        sys.exit(1)
-        
-    X = full_df[features]
-    y = full_df[target]
+    transform = FeatureTransform()
+    X, y = extract_vectors(full_df, transform)
     
     # 3. Fit & Evaluate
     logger.info("Engaging Random Forest Regressor architecture...")
     model, metrics = train_demand_model(X, y)
+    metrics.update({"Mode": "memory", **(peak_rss_mb() or {})})
+    report_metrics(metrics)
+
+    # The random split above leaks future hours into training; the backtest is the honest score
+    if args.backtest_folds:
+        try:
+            table, summary = run_backtest(X, y, full_df['time'].to_numpy(), n_folds=args.backtest_folds,
+                                          max_workers=args.workers)
+        except ValueError as e:
+            # Too little history for the requested folds must not cost the freshly fitted model
+            logger.warning(f"Backtest skipped: {e}")
+        else:
+            logger.info("--- Rolling-Origin Backtest ---\n" + table.to_string(index=False, float_format="%.3f"))
+            logger.info(f"Backtest MAE {summary['mean_MAE']:.3f} kWh / RMSE {summary['mean_RMSE']:.3f} kWh "
+                        f"over {summary['n_folds']} folds in {summary['total_wall_seconds']:.1f}s")
+            metrics["Backtest"] = summary
+
+    if args.shard_dir:
+        logger.info("Training per-zone shard models...")
+        train_zone_shards(full_df, load_station_zones(args.station_info), args.shard_dir, transform,
+                          target=TARGET, min_rows=args.shard_min_rows, max_workers=args.workers)
     
-    logger.info("--- Model Efficacy Report ---")
-    logger.info(f"Mean Absolute Error : {metrics['MAE']:.3f} kWh")
-    logger.info(f"Root Mean Sq. Error : {metrics['RMSE']:.3f} kWh")
-    logger.info(f"Validation Sample Sz: {metrics['Test_Samples']}")
-    
+    # The master table is already in memory (with busy/idle, for occupancy), so refresh from it directly
+    refresh_rollups(args, full_df)
+
     # 4. Export Artifact
-    save_model(model, metrics, MODEL_PATH)
+    save_training_set(args.training_set, X, y, full_df['time'].to_numpy(dtype="datetime64[ns]"),
+                      full_df['station_id'].to_numpy())
+    metadata = {"trained_at": started_at, "watermarks": compute_watermarks(full_df)}
+    save_model(model, metrics, model_path, artifact_format=args.artifact_format,
+               feature_spec=transform.to_spec(), metadata=metadata)
 
 if __name__ == "__main__":
     main()